@@ -2,14 +2,31 @@ from flask import Flask
 from flask_login import LoginManager
 from models import db, User
 from routes import init_routes
+from fragment_cache import init_fragment_cache
+from compression import init_compression
+from assets import init_assets
+from upgrade_db import upgrade_schema
 import os
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///database.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///database.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['FRAGMENT_CACHE_SIZE'] = 2000  # rendered product cards kept in memory
+app.config['COMPRESS_MIN_SIZE'] = 500  # bytes; smaller responses are sent uncompressed
+app.config['COMPRESS_LEVEL'] = 6
+# Outgoing email, sent by notifications.py; defaults suit a local debugging SMTP server
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'localhost')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 1025))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS') == '1'
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+app.config['MAIL_SENDER'] = os.environ.get('MAIL_SENDER', 'e-Nursery <orders@enursery.com>')
+app.config['MAIL_CONNECTIONS'] = 4  # SMTP connections kept open by the dispatcher
+app.config['SITE_URL'] = os.environ.get('SITE_URL', 'http://localhost:5000')  # for links in emails
+app.config['CART_EXPIRY_DAYS'] = int(os.environ.get('CART_EXPIRY_DAYS', 30))  # idle carts are purged by carts.py
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -31,9 +48,19 @@ def load_user(user_id):
 # Initialize routes
 init_routes(app)
 
-# Create tables
+# Initialize template fragment cache
+init_fragment_cache(app)
+
+# Initialize self-hosted static assets
+init_assets(app)
+
+# Initialize response compression
+init_compression(app)
+
+# Create tables, and add columns existing databases are missing
 with app.app_context():
-    db.create_all()
+    for change in upgrade_schema():
+        print(f"✓ Schema upgrade: {change}")
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Order archival for e-Nursery
+
+Moves Delivered and Cancelled orders older than ARCHIVE_AFTER_DAYS (and
+their items) from orders/order_items into orders_archive and
+order_items_archive, one batch per transaction, so the hot tables and
+their indexes only hold recent and open orders. The read helpers below
+merge both sides for the few views that need full history.
+
+Run nightly:
+    python archive.py [--days N]
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import selectinload, undefer
+
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+ARCHIVE_AFTER_DAYS = 365
+BATCH_SIZE = 500
+CLOSED_STATUSES = ('Delivered', 'Cancelled')
+
+ORDER_FIELDS = ['id', 'user_id', 'total_amount', 'order_status', 'payment_status', 'payment_method',
+                'tracking_number', 'shipping_address', 'estimated_delivery', 'created_at']
+ORDER_ITEM_FIELDS = ['id', 'order_id', 'item_type', 'item_id', 'item_name', 'quantity', 'price', 'subtotal']
+
+
+def archive_orders(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE):
+    """Move closed orders older than the cutoff into the archive tables; returns the number moved"""
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = 0
+
+    while True:
+        order_ids = [order_id for (order_id,) in db.session.query(Order.id).filter(
+            Order.order_status.in_(CLOSED_STATUSES),
+            Order.created_at < cutoff
+        ).order_by(Order.id).limit(batch_size)]
+        if not order_ids:
+            break
+
+        now = datetime.utcnow()
+        db.session.execute(db.insert(ArchivedOrder).from_select(
+            ORDER_FIELDS + ['archived_at'],
+            select(*[getattr(Order, field) for field in ORDER_FIELDS], literal(now, db.DateTime)).where(
+                Order.id.in_(order_ids))
+        ))
+        db.session.execute(db.insert(ArchivedOrderItem).from_select(
+            ORDER_ITEM_FIELDS,
+            select(*[getattr(OrderItem, field) for field in ORDER_ITEM_FIELDS]).where(
+                OrderItem.order_id.in_(order_ids))
+        ))
+        db.session.execute(db.delete(OrderItem).where(OrderItem.order_id.in_(order_ids)),
+                           execution_options={'synchronize_session': False})
+        db.session.execute(db.delete(Order).where(Order.id.in_(order_ids)),
+                           execution_options={'synchronize_session': False})
+        db.session.commit()
+        moved += len(order_ids)
+
+    return moved
+
+
+def all_orders():
+    """Subquery of (id, user_id, total_amount, order_status, created_at) over hot and archived orders"""
+    columns = ['id', 'user_id', 'total_amount', 'order_status', 'created_at']
+    return union_all(
+        select(*[getattr(Order, column) for column in columns]),
+        select(*[getattr(ArchivedOrder, column) for column in columns])
+    ).subquery()
+
+
+def all_order_lines():
+    """Subquery of order lines with their order's user, status and dates, over hot and archived orders"""
+    def lines(order, item):
+        return select(item.order_id, item.item_type, item.item_id, item.quantity, order.user_id,
+                      order.order_status, order.created_at, order.estimated_delivery).join(order, item.order_id == order.id)
+
+    return union_all(lines(Order, OrderItem), lines(ArchivedOrder, ArchivedOrderItem)).subquery()
+
+
+def order_history(user_id, include_archived=False):
+    """A customer's orders, newest first; archived ones only when asked for"""
+    orders = Order.query.filter_by(user_id=user_id).options(
+        selectinload(Order.order_items)
+    ).order_by(Order.created_at.desc()).all()
+    if include_archived:
+        orders += ArchivedOrder.query.filter_by(user_id=user_id).options(
+            selectinload(ArchivedOrder.order_items)
+        ).order_by(ArchivedOrder.created_at.desc()).all()
+        orders.sort(key=lambda order: order.created_at, reverse=True)
+    return orders
+
+
+def has_archived_orders(user_id):
+    return db.session.query(ArchivedOrder.id).filter_by(user_id=user_id).first() is not None
+
+
+def find_order(order_id):
+    """An order by id from the hot table, falling back to the archive"""
+    return (Order.query.options(undefer(Order.shipping_address)).get(order_id)
+            or ArchivedOrder.query.options(undefer(ArchivedOrder.shipping_address)).get(order_id))
+
+
+def find_order_by_tracking_number(tracking_number):
+    return (Order.query.filter_by(tracking_number=tracking_number).first()
+            or ArchivedOrder.query.filter_by(tracking_number=tracking_number).first())
+
+
+if __name__ == '__main__':
+    from app import app
+
+    days = ARCHIVE_AFTER_DAYS
+    if '--days' in sys.argv:
+        days = int(sys.argv[sys.argv.index('--days') + 1])
+
+    with app.app_context():
+        count = archive_orders(days)
+    print(f"✅ {count} order(s) older than {days} days archived")
@@ -0,0 +1,53 @@
+import json
+import os
+
+from flask import request, url_for
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Third-party assets that are vendored under static/ by build_assets.py.
+# The CDN URL is only used as a fallback when the asset has not been built.
+VENDOR_ASSETS = {
+    'vendor/bootstrap/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/font/bootstrap-icons.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/bootstrap-icons.css',
+    'vendor/bootstrap-icons/font/fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/font/fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.0/font/fonts/bootstrap-icons.woff',
+}
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def init_assets(app):
+    manifest = load_manifest(app.static_folder)
+    dist_prefix = f"{app.static_url_path}/{DIST_DIR}/"
+
+    def static_url(filename):
+        """URL of a static file, preferring its fingerprinted build output."""
+        if filename in manifest:
+            return url_for('static', filename=f"{DIST_DIR}/{manifest[filename]}")
+        if filename in VENDOR_ASSETS and not os.path.exists(os.path.join(app.static_folder, filename)):
+            return VENDOR_ASSETS[filename]
+        return url_for('static', filename=filename)
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        # Fingerprinted filenames change with their content, so they never go stale
+        if request.path.startswith(dist_prefix) and response.status_code in (200, 206, 304):
+            response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        return response
+
+    app.jinja_env.globals['static_url'] = static_url
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Build self-hosted, fingerprinted static assets for e-Nursery
+
+This script will:
+1. Vendor Bootstrap and Bootstrap Icons into static/vendor/
+   (downloaded from the CDN, or copied from --from-dir on air-gapped hosts)
+2. Copy every CSS/JS file under static/ into static/dist/ with a content
+   hash in its filename, rewriting url() references inside CSS
+3. Write static/dist/manifest.json, used by static_url() in templates
+4. Precompress the fingerprinted files (.gz/.br)
+
+Usage:
+    python build_assets.py
+    python build_assets.py --from-dir /path/to/mirror
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.request
+
+from assets import DIST_DIR, MANIFEST_NAME, VENDOR_ASSETS
+from precompress_static import precompress_static
+
+STATIC_FOLDER = 'static'
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def vendor_assets(from_dir=None):
+    """Fetch each vendored asset unless it is already present"""
+    for relative_path, cdn_url in VENDOR_ASSETS.items():
+        target = os.path.join(STATIC_FOLDER, relative_path)
+        if os.path.exists(target):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if from_dir:
+            shutil.copyfile(os.path.join(from_dir, relative_path), target)
+        else:
+            with urllib.request.urlopen(cdn_url, timeout=30) as response, open(target, 'wb') as f:
+                shutil.copyfileobj(response, f)
+        print(f"✓ vendored {relative_path}")
+
+
+def fingerprinted_name(relative_path, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}.{digest}{ext}"
+
+
+class AssetBuilder:
+    def __init__(self, static_folder=STATIC_FOLDER):
+        self.static_folder = static_folder
+        self.dist_folder = os.path.join(static_folder, DIST_DIR)
+        self.manifest = {}
+
+    def build(self, relative_path):
+        """Fingerprint one asset (and, for CSS, everything it references)"""
+        relative_path = os.path.normpath(relative_path).replace(os.sep, '/')
+        if relative_path in self.manifest:
+            return self.manifest[relative_path]
+
+        with open(os.path.join(self.static_folder, relative_path), 'rb') as f:
+            data = f.read()
+
+        if relative_path.endswith('.css'):
+            data = self._rewrite_css_urls(relative_path, data)
+
+        output = fingerprinted_name(relative_path, data)
+        target = os.path.join(self.dist_folder, output)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+
+        self.manifest[relative_path] = output
+        return output
+
+    def _rewrite_css_urls(self, relative_path, data):
+        css_dir = os.path.dirname(relative_path)
+
+        def replace(match):
+            quote, url = match.groups()
+            if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+                return match.group(0)
+            path, sep, suffix = url.partition('?')
+            referenced = os.path.normpath(os.path.join(css_dir, path))
+            if not os.path.exists(os.path.join(self.static_folder, referenced)):
+                return match.group(0)
+            output = self.build(referenced)
+            new_url = os.path.relpath(output, os.path.dirname(fingerprinted_name(relative_path, b''))).replace(os.sep, '/')
+            return f"url({quote}{new_url}{quote})"
+
+        return CSS_URL_RE.sub(replace, data.decode('utf-8')).encode('utf-8')
+
+    def build_all(self):
+        if os.path.exists(self.dist_folder):
+            shutil.rmtree(self.dist_folder)
+
+        for root, dirs, files in os.walk(self.static_folder):
+            dirs[:] = [d for d in dirs if d != 'uploads']
+            for name in sorted(files):
+                if name.endswith(FINGERPRINT_EXTENSIONS):
+                    path = os.path.relpath(os.path.join(root, name), self.static_folder)
+                    self.build(path)
+
+        with open(os.path.join(self.dist_folder, MANIFEST_NAME), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return self.manifest
+
+
+if __name__ == '__main__':
+    from_dir = None
+    if '--from-dir' in sys.argv:
+        from_dir = sys.argv[sys.argv.index('--from-dir') + 1]
+
+    vendor_assets(from_dir)
+    manifest = AssetBuilder().build_all()
+    for source, output in sorted(manifest.items()):
+        print(f"✓ {source} -> {DIST_DIR}/{output}")
+
+    precompress_static(os.path.join(STATIC_FOLDER, DIST_DIR))
+    print(f"\n✅ {len(manifest)} asset(s) fingerprinted. Restart the app to pick up the new manifest.")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Abandoned cart expiry for e-Nursery
+
+A cart expires when none of its lines has changed for CART_EXPIRY_DAYS
+(app config). Expired lines are copied into abandoned_carts with the
+product's price at that moment, then deleted, a batch of users per
+transaction, so the live cart table only holds carts people still use.
+
+Scheduled by scheduler.py; to run by hand:
+    python carts.py [--days N]
+"""
+
+import sys
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import literal, select
+
+from models import db, Cart, AbandonedCart, Plant, Ingredient
+
+BATCH_SIZE = 500
+
+
+def expire_carts(older_than_days=None, batch_size=BATCH_SIZE):
+    """Snapshot and delete carts idle for longer than the cutoff; returns the number of carts expired"""
+    if older_than_days is None:
+        older_than_days = current_app.config['CART_EXPIRY_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    unit_price = db.case(
+        (Cart.item_type == 'plant', select(Plant.price).where(Plant.id == Cart.item_id).scalar_subquery()),
+        else_=select(Ingredient.price).where(Ingredient.id == Cart.item_id).scalar_subquery()
+    )
+    expired = 0
+
+    while True:
+        user_ids = [user_id for (user_id,) in db.session.query(Cart.user_id).group_by(Cart.user_id).having(
+            db.func.max(Cart.updated_at) < cutoff
+        ).order_by(Cart.user_id).limit(batch_size)]
+        if not user_ids:
+            break
+
+        # A cart touched since the batch was picked is live again, all of its lines included
+        touched = db.aliased(Cart)
+        stale = db.and_(Cart.user_id.in_(user_ids), ~db.exists().where(
+            touched.user_id == Cart.user_id, touched.updated_at >= cutoff))
+        now = datetime.utcnow()
+        db.session.execute(db.insert(AbandonedCart).from_select(
+            ['user_id', 'item_type', 'item_id', 'quantity', 'price', 'added_at', 'last_updated_at', 'expired_at'],
+            select(Cart.user_id, Cart.item_type, Cart.item_id, Cart.quantity, unit_price,
+                   Cart.created_at, Cart.updated_at, literal(now, db.DateTime)).where(stale)
+        ))
+        db.session.execute(db.delete(Cart).where(stale), execution_options={'synchronize_session': False})
+        db.session.commit()
+        expired += len(user_ids)
+
+    return expired
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        days = app.config['CART_EXPIRY_DAYS']
+        if '--days' in sys.argv:
+            days = int(sys.argv[sys.argv.index('--days') + 1])
+        count = expire_carts(days)
+    print(f"✅ {count} cart(s) idle for more than {days} days expired")
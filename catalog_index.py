@@ -0,0 +1,245 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from models import db, Plant, Ingredient, CatalogVersion
+
+CATALOG = 'catalog'
+# Stock and popularity counters change with every order, wishlist and review; rather than
+# bumping the catalog version for those, indexes are rebuilt once they are this old (seconds)
+COUNTER_REFRESH_INTERVAL = 60
+
+# (min_price, max_price) bands shown in the listing sidebars, both ends inclusive
+PRICE_BANDS = [
+    (None, 99.99, 'Under ₹100'),
+    (100, 249.99, '₹100 – ₹250'),
+    (250, 499.99, '₹250 – ₹500'),
+    (500, 999.99, '₹500 – ₹1,000'),
+    (1000, None, '₹1,000 & above'),
+]
+
+# Sort modes offered on the listing pages. The empty key keeps catalog order.
+SORT_OPTIONS = {
+    'plant': [
+        ('', 'Featured'),
+        ('price_asc', 'Price: Low to High'),
+        ('price_desc', 'Price: High to Low'),
+        ('newest', 'Newest'),
+        ('rating', 'Top Rated'),
+        ('best_selling', 'Best Selling'),
+        ('most_wishlisted', 'Most Wishlisted'),
+    ],
+    'ingredient': [
+        ('', 'Featured'),
+        ('price_asc', 'Price: Low to High'),
+        ('price_desc', 'Price: High to Low'),
+        ('newest', 'Newest'),
+        ('best_selling', 'Best Selling'),
+    ],
+}
+
+SORT_KEYS = {
+    'price_asc': lambda index, pos: (index.prices[pos], index.ids[pos]),
+    'price_desc': lambda index, pos: (-index.prices[pos], index.ids[pos]),
+    'newest': lambda index, pos: (-index.created[pos], -index.ids[pos]),
+    'rating': lambda index, pos: (-index.ratings[pos], index.ids[pos]),
+    'best_selling': lambda index, pos: (-index.units_sold[pos], index.ids[pos]),
+    'most_wishlisted': lambda index, pos: (-index.wishlist_counts[pos], index.ids[pos]),
+}
+
+
+def get_catalog_version(name=CATALOG):
+    return db.session.query(CatalogVersion.version).filter_by(name=name).scalar() or 0
+
+
+def bump_catalog_version(name=CATALOG):
+    """Mark the catalog as changed; every worker rebuilds its index on next use.
+
+    For admin catalog edits and bulk counter rebuilds; customer traffic is picked
+    up by the COUNTER_REFRESH_INTERVAL refresh instead. Runs inside the caller's
+    transaction, so the bump commits with the change.
+    """
+    updated = CatalogVersion.query.filter_by(name=name).update(
+        {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        db.session.add(CatalogVersion(name=name, version=1))
+
+
+def bits_from_positions(positions, size):
+    """Build a bitset from row positions in O(n), without big-int shifting per bit."""
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
+
+
+def positions_from_bits(bits):
+    return [pos for pos, bit in enumerate(reversed(bin(bits)[2:])) if bit == '1']
+
+
+class CatalogIndex:
+    """Columnar, read-only snapshot of one product table.
+
+    Rows are addressed by position. Filters are answered with Python ints used
+    as bitsets (bit ``i`` set means row ``i`` matches), so combining filters is
+    a handful of integer ANDs and facet counts are popcounts. Every sort mode
+    is presorted at build time, so a request only walks one order.
+    """
+
+    def __init__(self, rows):
+        # rows: iterable of (id, facet, price, stock, created_at, units_sold, wishlist_count, rating)
+        self.ids = array('q')
+        self.prices = array('d')
+        self.stocks = array('q')
+        self.created = array('d')
+        self.units_sold = array('q')
+        self.wishlist_counts = array('q')
+        self.ratings = array('d')
+        self.facet_codes = array('H')
+        self.facet_names = []
+
+        facet_lookup = {}
+        facet_positions = []
+        in_stock_positions = []
+        for pos, (id_, facet, price, stock, created_at, units_sold, wishlist_count, rating) in enumerate(rows):
+            if facet not in facet_lookup:
+                facet_lookup[facet] = len(self.facet_names)
+                self.facet_names.append(facet)
+                facet_positions.append([])
+            self.ids.append(id_)
+            self.prices.append(price)
+            self.stocks.append(stock or 0)
+            self.created.append(created_at.timestamp() if created_at else 0)
+            self.units_sold.append(units_sold or 0)
+            self.wishlist_counts.append(wishlist_count or 0)
+            self.ratings.append(rating or 0)
+            self.facet_codes.append(facet_lookup[facet])
+            facet_positions[facet_lookup[facet]].append(pos)
+            if stock and stock > 0:
+                in_stock_positions.append(pos)
+
+        size = len(self.ids)
+        self.all_bits = (1 << size) - 1
+        self.facet_bits = {facet: bits_from_positions(facet_positions[code], size)
+                           for code, facet in enumerate(self.facet_names)}
+        self.in_stock_bits = bits_from_positions(in_stock_positions, size)
+        self.positions = {id_: pos for pos, id_ in enumerate(self.ids)}
+
+        self.sort_orders = {sort: array('q', sorted(range(size), key=lambda pos, key=key: key(self, pos)))
+                            for sort, key in SORT_KEYS.items()}
+
+        # Positions sorted by price, with a parallel array for bisecting
+        self.price_order = self.sort_orders['price_asc']
+        self.sorted_prices = array('d', (self.prices[pos] for pos in self.price_order))
+        self.price_band_bits = [(band, self.price_range_bits(band[0], band[1])) for band in PRICE_BANDS]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def price_range_bits(self, min_price=None, max_price=None):
+        lo = 0 if min_price is None else bisect_left(self.sorted_prices, min_price)
+        hi = len(self.sorted_prices) if max_price is None else bisect_right(self.sorted_prices, max_price)
+        return bits_from_positions(self.price_order[lo:hi], len(self.ids))
+
+    def _filter_parts(self, facet, min_price, max_price, in_stock, ids):
+        facet_bits = self.facet_bits.get(facet, 0) if facet else self.all_bits
+        price_bits = self.all_bits
+        if min_price is not None or max_price is not None:
+            price_bits = self.price_range_bits(min_price, max_price)
+        stock_bits = self.in_stock_bits if in_stock else self.all_bits
+        id_bits = self.all_bits
+        if ids is not None:
+            id_bits = bits_from_positions(
+                (self.positions[id_] for id_ in ids if id_ in self.positions), len(self.ids))
+        return facet_bits, price_bits, stock_bits, id_bits
+
+    def filter(self, facet=None, min_price=None, max_price=None, in_stock=False, ids=None):
+        facet_bits, price_bits, stock_bits, id_bits = self._filter_parts(facet, min_price, max_price, in_stock, ids)
+        return facet_bits & price_bits & stock_bits & id_bits
+
+    def facet_summary(self, facet=None, min_price=None, max_price=None, in_stock=False, ids=None):
+        """Filter the index and count every facet in one pass.
+
+        Each facet is counted against all the *other* active filters, so the
+        counts show how many results picking that option would give.
+        Returns ``(matches, counts)`` where ``matches`` is the result bitset.
+        """
+        facet_bits, price_bits, stock_bits, id_bits = self._filter_parts(facet, min_price, max_price, in_stock, ids)
+        matches = facet_bits & price_bits & stock_bits & id_bits
+
+        counts = {
+            'facets': self.facet_counts(price_bits & stock_bits & id_bits),
+            'price_bands': [
+                {'min_price': lo, 'max_price': hi, 'label': label,
+                 'count': (facet_bits & stock_bits & id_bits & band_bits).bit_count()}
+                for (lo, hi, label), band_bits in self.price_band_bits
+            ],
+            'in_stock': (facet_bits & price_bits & id_bits & self.in_stock_bits).bit_count(),
+            'total': matches.bit_count(),
+        }
+        return matches, counts
+
+    def ids_for(self, bits, sort=None, limit=None):
+        if sort in self.sort_orders:
+            matched = set(positions_from_bits(bits))
+            positions = [pos for pos in self.sort_orders[sort] if pos in matched]
+        else:
+            positions = positions_from_bits(bits)
+        if limit is not None:
+            positions = positions[:limit]
+        return [self.ids[pos] for pos in positions]
+
+    def facet_counts(self, bits):
+        return {facet: (bits & facet_bits).bit_count() for facet, facet_bits in self.facet_bits.items()}
+
+
+def _plant_rows():
+    return db.session.query(
+        Plant.id, Plant.category, Plant.price, Plant.stock, Plant.created_at,
+        Plant.units_sold, Plant.wishlist_count, Plant.rating_average
+    ).order_by(Plant.id).all()
+
+
+def _ingredient_rows():
+    return db.session.query(
+        Ingredient.id, Ingredient.type, Ingredient.price, Ingredient.stock, Ingredient.created_at,
+        Ingredient.units_sold, db.literal(0), db.literal(0)
+    ).order_by(Ingredient.id).all()
+
+
+_ROW_LOADERS = {
+    'plant': _plant_rows,
+    'ingredient': _ingredient_rows,
+}
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_catalog_index(kind):
+    """Return this worker's index for 'plant' or 'ingredient', rebuilding it if stale."""
+    version = get_catalog_version()
+
+    def fresh(cached):
+        return (cached is not None and cached[0] == version
+                and time.monotonic() - cached[1] < COUNTER_REFRESH_INTERVAL)
+
+    cached = _indexes.get(kind)
+    if fresh(cached):
+        return cached[2]
+
+    with _lock:
+        cached = _indexes.get(kind)
+        if not fresh(cached):
+            cached = (version, time.monotonic(), CatalogIndex(_ROW_LOADERS[kind]()))
+            _indexes[kind] = cached
+    return cached[2]
+
+
+def load_products(model, ids, *options):
+    """Fetch products by id, returned in the order of ``ids``."""
+    if not ids:
+        return []
+    by_id = {product.id: product for product in model.query.options(*options).filter(model.id.in_(ids))}
+    return [by_id[id_] for id_ in ids if id_ in by_id]
@@ -0,0 +1,172 @@
+import os
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def parse_accept_encoding(header):
+    """Return the set of codings the client accepts (q > 0)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(accepted, available):
+    for coding in ('br', 'gzip'):
+        if coding in available and (coding in accepted or '*' in accepted):
+            return coding
+    return None
+
+
+class _StreamingCompressor:
+    def __init__(self, coding, level):
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+            self.compress = self._compressor.process
+            self.flush = self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = self._compressor.compress
+            self.flush = self._compressor.flush
+
+
+class CompressionMiddleware:
+    """WSGI middleware that gzip/brotli-encodes responses.
+
+    Dynamic responses are compressed chunk by chunk as they are streamed when
+    they are at least ``min_size`` bytes (or of unknown length). Requests for
+    static files are answered with a precompressed ``.br``/``.gz`` sibling
+    when one exists, so static files never cost CPU per request.
+    """
+
+    def __init__(self, app, static_folder=None, static_url_path='/static', min_size=500, level=6):
+        self.app = app
+        self.static_folder = static_folder
+        self.static_prefix = static_url_path.rstrip('/') + '/'
+        self.min_size = min_size
+        self.level = level
+        self.available = {'gzip', 'br'} if brotli is not None else {'gzip'}
+
+    def __call__(self, environ, start_response):
+        accepted = parse_accept_encoding(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        if not accepted:
+            return self.app(environ, start_response)
+
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.static_prefix):
+            return self._serve_static(environ, start_response, path, accepted)
+
+        coding = choose_encoding(accepted, self.available)
+        if coding is None:
+            return self.app(environ, start_response)
+        return self._serve_dynamic(environ, start_response, coding)
+
+    def _serve_static(self, environ, start_response, path, accepted):
+        if not self.static_folder:
+            return self.app(environ, start_response)
+
+        filename = path[len(self.static_prefix):]
+        source = safe_join(self.static_folder, filename)
+        if source is None or not os.path.isfile(source):
+            return self.app(environ, start_response)
+
+        for coding in ('br', 'gzip'):
+            if coding not in accepted and '*' not in accepted:
+                continue
+            suffix = PRECOMPRESSED_SUFFIXES[coding]
+            candidate = source + suffix
+            if os.path.isfile(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(source):
+                break
+        else:
+            return self.app(environ, start_response)
+
+        environ = dict(environ, PATH_INFO=path + suffix)
+
+        def _start_response(status, headers, exc_info=None):
+            headers = Headers(headers)
+            if status.startswith(('200', '206', '304')):
+                headers['Content-Encoding'] = coding
+                headers.add('Vary', 'Accept-Encoding')
+                # Don't advertise the .br/.gz filename of the sibling
+                headers.remove('Content-Disposition')
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+
+        return self.app(environ, _start_response)
+
+    def _serve_dynamic(self, environ, start_response, coding):
+        captured = {}
+
+        def _capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return lambda data: None
+
+        body = self.app(environ, _capture)
+        status = captured['status']
+        headers = Headers(captured['headers'])
+
+        if not self._should_compress(environ, status, headers):
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return body
+
+        headers.remove('Content-Length')
+        headers['Content-Encoding'] = coding
+        headers.add('Vary', 'Accept-Encoding')
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return self._compress_iter(body, _StreamingCompressor(coding, self.level))
+
+    def _should_compress(self, environ, status, headers):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or status[:3] in ('204', '206', '304'):
+            return False
+        if 'Content-Encoding' in headers:
+            return False
+        content_type = headers.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get('Content-Length', type=int)
+        return length is None or length >= self.min_size
+
+    @staticmethod
+    def _compress_iter(body, compressor):
+        try:
+            for chunk in body:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+
+
+def init_compression(app):
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        static_folder=app.static_folder,
+        static_url_path=app.static_url_path,
+        min_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+        level=app.config.get('COMPRESS_LEVEL', 6),
+    )
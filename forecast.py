@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Demand forecasting and reorder points for e-Nursery
+
+Loads recent OrderItem history into one daily-demand series per product,
+estimates a weekday-seasonal demand rate for every product in a single
+pass, and stores daily_demand and a lead-time reorder_point on each plant
+and ingredient. The admin dashboard flags products whose stock has fallen
+to their reorder point.
+
+Run nightly:
+    python forecast.py
+"""
+
+import math
+from array import array
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from models import db, Plant, Ingredient, Order, OrderItem, DEFAULT_REORDER_POINT
+
+HISTORY_DAYS = 84  # twelve full weeks, so every weekday is seen equally often
+LEAD_TIME_DAYS = 7
+SERVICE_LEVEL_Z = 1.65  # ~95% chance of not running out during the lead time
+SMOOTHING = 0.1  # exponential smoothing weight of the most recent day
+
+
+def load_daily_demand(today, history_days=HISTORY_DAYS):
+    """Units sold per product per day as {(item_type, item_id): array of history_days floats}"""
+    start = today - timedelta(days=history_days)
+    day = db.func.date(Order.created_at)
+    rows = db.session.query(
+        OrderItem.item_type, OrderItem.item_id, day, db.func.sum(OrderItem.quantity)
+    ).join(Order).filter(
+        Order.created_at >= start,
+        Order.created_at < today,
+        Order.order_status != 'Cancelled'
+    ).group_by(OrderItem.item_type, OrderItem.item_id, day)
+
+    series = defaultdict(lambda: array('d', bytes(8 * history_days)))
+    for item_type, item_id, sold_on, quantity in rows:
+        offset = (datetime.strptime(str(sold_on), '%Y-%m-%d') - start).days
+        if 0 <= offset < history_days:
+            series[(item_type, item_id)][offset] += quantity
+    return start, series
+
+
+def weekday_factors(start, series):
+    """Pooled weekday seasonality: demand on each weekday relative to the average day"""
+    totals = [0.0] * 7
+    for demand in series.values():
+        for offset, units in enumerate(demand):
+            totals[(start + timedelta(days=offset)).weekday()] += units
+    overall = sum(totals) / 7
+    if not overall:
+        return [1.0] * 7
+    return [total / overall if total else 1.0 for total in totals]
+
+
+def forecast_product(demand, start, factors, today):
+    """Return (daily_demand, reorder_point) for one product's history"""
+    level = None
+    residuals = []
+    for offset, units in enumerate(demand):
+        deseasonalized = units / factors[(start + timedelta(days=offset)).weekday()]
+        if level is None:
+            level = deseasonalized
+        else:
+            residuals.append(deseasonalized - level)
+            level = SMOOTHING * deseasonalized + (1 - SMOOTHING) * level
+
+    lead_factor = sum(factors[(today + timedelta(days=d)).weekday()] for d in range(LEAD_TIME_DAYS))
+    lead_demand = level * lead_factor
+    variance = sum(r * r for r in residuals) / len(residuals) if residuals else 0
+    safety_stock = SERVICE_LEVEL_Z * math.sqrt(variance * LEAD_TIME_DAYS)
+    return level, max(math.ceil(lead_demand + safety_stock), 1)
+
+
+def run_forecast(today=None):
+    """Recompute daily_demand and reorder_point for every product"""
+    today = today or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start, series = load_daily_demand(today)
+    factors = weekday_factors(start, series)
+    now = datetime.utcnow()
+
+    updates = {'plant': [], 'ingredient': []}
+    for (item_type, item_id), demand in series.items():
+        daily_demand, reorder_point = forecast_product(demand, start, factors, today)
+        updates[item_type].append({
+            'id': item_id,
+            'daily_demand': daily_demand,
+            'reorder_point': reorder_point,
+            'updated_at': now,
+        })
+
+    for model, item_type in ((Plant, 'plant'), (Ingredient, 'ingredient')):
+        # Products with no recent sales fall back to the fixed threshold
+        db.session.execute(db.update(model).where(db.or_(
+            model.daily_demand != 0, model.reorder_point != DEFAULT_REORDER_POINT
+        )).values(daily_demand=0, reorder_point=DEFAULT_REORDER_POINT, updated_at=now))
+        existing = {product_id for (product_id,) in db.session.query(model.id)}
+        rows = [row for row in updates[item_type] if row['id'] in existing]
+        if rows:
+            db.session.execute(db.update(model), rows)
+
+    db.session.commit()
+    return sum(len(rows) for rows in updates.values())
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        count = run_forecast()
+    print(f"✅ Forecast updated for {count} product(s) with recent sales")
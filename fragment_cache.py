@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+DEFAULT_FRAGMENT_CACHE_SIZE = 2000
+
+
+class LRUCache:
+    """Thread-safe LRU with O(1) hits (jinja2.utils.LRUCache is O(capacity) per hit)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class FragmentCacheExtension(Extension):
+    """Caches rendered template fragments in a bounded LRU.
+
+    Usage::
+
+        {% cache 'plant-card', plant.id, plant.updated_at %}
+            ...markup that only depends on the plant...
+        {% endcache %}
+
+    The key parts must change whenever the fragment output changes, e.g. the
+    product id plus its ``updated_at`` timestamp.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)  # set by init_fragment_cache()
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_parts.append(parser.parse_expression())
+
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.List(key_parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key_parts, caller):
+        key = tuple(str(part) for part in key_parts)
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return Markup(caller())
+
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = Markup(caller())
+            cache.set(key, fragment)
+        return fragment
+
+
+def init_fragment_cache(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    size = app.config.get('FRAGMENT_CACHE_SIZE', DEFAULT_FRAGMENT_CACHE_SIZE)
+    app.jinja_env.fragment_cache = LRUCache(size)
@@ -6,6 +6,13 @@ import secrets
 
 db = SQLAlchemy()
 
+# Low-stock threshold for products without a demand forecast (see forecast.py)
+DEFAULT_REORDER_POINT = 5
+
+
+# Large text columns are deferred into a 'details' group so list pages only
+# load names, prices and stock. Pages that show them use undefer()/undefer_group().
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -16,7 +23,7 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(200), nullable=False)
     full_name = db.Column(db.String(100))
     phone = db.Column(db.String(15))
-    address = db.Column(db.Text)
+    address = db.deferred(db.Column(db.Text), group='details')
     city = db.Column(db.String(50))
     state = db.Column(db.String(50))
     pincode = db.Column(db.String(10))
@@ -41,33 +48,67 @@ class User(UserMixin, db.Model):
 
 class Plant(db.Model):
     __tablename__ = 'plants'
+    __table_args__ = (
+        db.Index('ix_plants_stock_reorder_point', 'stock', 'reorder_point'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    synonyms = db.Column(db.String(200))  # comma-separated alternate names for search
     category = db.Column(db.String(50), nullable=False)  # Medicinal, Flower, Vegetable, Fruit
-    price = db.Column(db.Float, nullable=False)
-    description = db.Column(db.Text)
+    price = db.Column(db.Float, nullable=False, index=True)
+    description = db.deferred(db.Column(db.Text), group='details')
     sunlight = db.Column(db.String(50))
     water = db.Column(db.String(50))
-    care_instructions = db.Column(db.Text)
+    care_instructions = db.deferred(db.Column(db.Text), group='details')
     stock = db.Column(db.Integer, default=0)
     image = db.Column(db.String(200), default='default_plant.jpg')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Denormalized counters for sorting, maintained by product_stats
+    units_sold = db.Column(db.Integer, default=0, nullable=False, index=True)
+    wishlist_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_average = db.Column(db.Float, default=0, nullable=False, index=True)
+    # Star histogram: number of reviews with each rating
+    rating_1_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_2_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_3_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_4_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_5_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Demand forecast, refreshed by forecast.py
+    daily_demand = db.Column(db.Float, default=0, nullable=False)
+    reorder_point = db.Column(db.Integer, default=DEFAULT_REORDER_POINT, nullable=False)
+
     # Relationships
     reviews = db.relationship('Review', backref='plant', lazy=True)
     wishlists = db.relationship('Wishlist', backref='plant', lazy=True)
 
     @property
     def average_rating(self):
-        if not self.reviews:
-            return 0
-        return sum(review.rating for review in self.reviews) / len(self.reviews)
+        return self.rating_average or 0
+
+    @property
+    def rating_histogram(self):
+        """(stars, count, percent) from 5 stars down to 1"""
+        total = self.review_count or 0
+        histogram = []
+        for stars in range(5, 0, -1):
+            count = getattr(self, f'rating_{stars}_count') or 0
+            histogram.append((stars, count, round(count * 100 / total) if total else 0))
+        return histogram
 
     @property
     def is_low_stock(self):
-        return 0 < self.stock <= 5
+        return 0 < self.stock <= self.reorder_point
+
+    @property
+    def days_of_cover(self):
+        if not self.daily_demand:
+            return None
+        return self.stock / self.daily_demand
 
     @property
     def is_out_of_stock(self):
@@ -79,20 +120,38 @@ class Plant(db.Model):
 
 class Ingredient(db.Model):
     __tablename__ = 'ingredients'
+    __table_args__ = (
+        db.Index('ix_ingredients_stock_reorder_point', 'stock', 'reorder_point'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    synonyms = db.Column(db.String(200))  # comma-separated alternate names for search
     type = db.Column(db.String(50), nullable=False)  # Fertilizer, Soil, Pot, Tools, Seeds
-    price = db.Column(db.Float, nullable=False)
-    description = db.Column(db.Text)
-    usage_instructions = db.Column(db.Text)
+    price = db.Column(db.Float, nullable=False, index=True)
+    description = db.deferred(db.Column(db.Text), group='details')
+    usage_instructions = db.deferred(db.Column(db.Text), group='details')
     stock = db.Column(db.Integer, default=0)
     image = db.Column(db.String(200), default='default_ingredient.jpg')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Denormalized counter for sorting, maintained by product_stats
+    units_sold = db.Column(db.Integer, default=0, nullable=False, index=True)
+
+    # Demand forecast, refreshed by forecast.py
+    daily_demand = db.Column(db.Float, default=0, nullable=False)
+    reorder_point = db.Column(db.Integer, default=DEFAULT_REORDER_POINT, nullable=False)
 
     @property
     def is_low_stock(self):
-        return 0 < self.stock <= 5
+        return 0 < self.stock <= self.reorder_point
+
+    @property
+    def days_of_cover(self):
+        if not self.daily_demand:
+            return None
+        return self.stock / self.daily_demand
 
     @property
     def is_out_of_stock(self):
@@ -104,6 +163,9 @@ class Ingredient(db.Model):
 
 class Cart(db.Model):
     __tablename__ = 'cart'
+    __table_args__ = (
+        db.Index('ix_cart_user_item', 'user_id', 'item_type', 'item_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -111,6 +173,7 @@ class Cart(db.Model):
     item_id = db.Column(db.Integer, nullable=False)
     quantity = db.Column(db.Integer, default=1)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def get_item(self):
         if self.item_type == 'plant':
@@ -129,8 +192,31 @@ class Cart(db.Model):
         return f'<Cart User:{self.user_id} Item:{self.item_type}:{self.item_id}>'
 
 
+class AbandonedCart(db.Model):
+    """Snapshot of a cart line removed by the expiry job, kept for analytics"""
+    __tablename__ = 'abandoned_carts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    item_type = db.Column(db.String(20), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float)  # unit price when the cart expired
+    added_at = db.Column(db.DateTime)
+    last_updated_at = db.Column(db.DateTime)
+    expired_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<AbandonedCart User:{self.user_id} {self.item_type}:{self.item_id}>'
+
+
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_user_created', 'user_id', 'created_at'),
+        # Never reuse ids of archived orders, so hot and archive ids can't collide
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -139,13 +225,15 @@ class Order(db.Model):
     payment_status = db.Column(db.String(50), default='Pending')
     payment_method = db.Column(db.String(50))
     tracking_number = db.Column(db.String(50), unique=True)
-    shipping_address = db.Column(db.Text)
+    shipping_address = db.deferred(db.Column(db.Text), group='details')
     estimated_delivery = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationships
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
 
+    is_archived = False
+
     def generate_tracking_number(self):
         self.tracking_number = f"ENO{secrets.token_hex(6).upper()}"
 
@@ -155,9 +243,12 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     item_type = db.Column(db.String(20), nullable=False)  # 'plant' or 'ingredient'
     item_id = db.Column(db.Integer, nullable=False)
     item_name = db.Column(db.String(100))
@@ -169,8 +260,57 @@ class OrderItem(db.Model):
         return f'<OrderItem Order:{self.order_id} {self.item_type}:{self.item_id}>'
 
 
+class ArchivedOrder(db.Model):
+    """Closed orders moved out of ``orders`` by archive.py; same columns plus archived_at"""
+    __tablename__ = 'orders_archive'
+    __table_args__ = (
+        db.Index('ix_orders_archive_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    total_amount = db.Column(db.Float, nullable=False)
+    order_status = db.Column(db.String(50))
+    payment_status = db.Column(db.String(50))
+    payment_method = db.Column(db.String(50))
+    tracking_number = db.Column(db.String(50), unique=True)
+    shipping_address = db.deferred(db.Column(db.Text), group='details')
+    estimated_delivery = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    order_items = db.relationship('ArchivedOrderItem', backref='order', lazy=True)
+    user = db.relationship('User')
+
+    is_archived = True
+
+    def __repr__(self):
+        return f'<ArchivedOrder {self.id} User:{self.user_id}>'
+
+
+class ArchivedOrderItem(db.Model):
+    __tablename__ = 'order_items_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False, index=True)
+    item_type = db.Column(db.String(20), nullable=False)
+    item_id = db.Column(db.Integer, nullable=False)
+    item_name = db.Column(db.String(100))
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    subtotal = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<ArchivedOrderItem Order:{self.order_id} {self.item_type}:{self.item_id}>'
+
+
 class Wishlist(db.Model):
     __tablename__ = 'wishlist'
+    __table_args__ = (
+        # Back-in-stock fan-out walks one plant's wishers in user_id order
+        db.Index('ix_wishlist_plant_user', 'plant_id', 'user_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -183,6 +323,10 @@ class Wishlist(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_plant_created', 'plant_id', 'created_at', 'id'),
+        db.Index('ix_reviews_plant_rating', 'plant_id', 'rating', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -193,4 +337,173 @@ class Review(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
-        return f'<Review User:{self.user_id} Plant:{self.plant_id} Rating:{self.rating}>'
\ No newline at end of file
+        return f'<Review User:{self.user_id} Plant:{self.plant_id} Rating:{self.rating}>'
+
+
+class CatalogVersion(db.Model):
+    __tablename__ = 'catalog_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.name}:{self.version}>'
+
+
+class ProductRecommendation(db.Model):
+    __tablename__ = 'product_recommendations'
+    __table_args__ = (
+        db.Index('ix_recommendations_item', 'item_type', 'item_id', 'rec_type', 'rank'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_type = db.Column(db.String(20), nullable=False)  # 'plant' or 'ingredient'
+    item_id = db.Column(db.Integer, nullable=False)
+    rec_type = db.Column(db.String(20), nullable=False)  # 'plant' or 'ingredient'
+    rec_id = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Integer, nullable=False)  # number of orders containing both
+    rank = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ProductRecommendation {self.item_type}:{self.item_id} -> {self.rec_type}:{self.rec_id}>'
+
+
+class CustomerSegment(db.Model):
+    __tablename__ = 'customer_segments'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    last_order_at = db.Column(db.DateTime)
+    recency_days = db.Column(db.Integer, index=True)
+    frequency = db.Column(db.Integer, default=0, nullable=False, index=True)  # orders in the RFM window
+    monetary = db.Column(db.Float, default=0, nullable=False, index=True)  # spend in the RFM window
+    lifetime_value = db.Column(db.Float, default=0, nullable=False, index=True)  # all-time spend
+    r_score = db.Column(db.Integer)  # 1-5
+    f_score = db.Column(db.Integer)  # 1-5
+    m_score = db.Column(db.Integer)  # 1-5
+    segment = db.Column(db.String(30), index=True)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('segment', uselist=False))
+
+    @property
+    def rfm(self):
+        return f'{self.r_score}{self.f_score}{self.m_score}'
+
+    def __repr__(self):
+        return f'<CustomerSegment User:{self.user_id} {self.segment}>'
+
+
+class VerifiedPurchase(db.Model):
+    """One row per product a customer has received, keyed for primary-key eligibility checks"""
+    __tablename__ = 'verified_purchases'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    item_type = db.Column(db.String(20), primary_key=True)  # 'plant' or 'ingredient'
+    item_id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False, index=True)  # first delivery; may since have been archived
+    delivered_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<VerifiedPurchase User:{self.user_id} {self.item_type}:{self.item_id}>'
+
+
+class OrderStatusEvent(db.Model):
+    """Append-only history of order status changes; never updated or deleted"""
+    __tablename__ = 'order_status_events'
+    __table_args__ = (
+        db.Index('ix_order_status_events_order_created', 'order_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)  # hot or archived order, so no foreign key
+    from_status = db.Column(db.String(50))  # None for the event that creates the order
+    to_status = db.Column(db.String(50), nullable=False)
+    changed_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    note = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<OrderStatusEvent Order:{self.order_id} {self.from_status} -> {self.to_status}>'
+
+
+class OutboxEvent(db.Model):
+    """Order events written in the same transaction as the change, delivered later by outbox.py"""
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        db.Index('ix_outbox_events_pending', 'processed_at', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)  # e.g. 'order.placed', 'order.status_changed'
+    aggregate_id = db.Column(db.Integer, nullable=False)  # order id
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)  # not retried before this
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    processed_at = db.Column(db.DateTime)  # set once delivered, or when retries run out
+    failed = db.Column(db.Boolean, default=False, nullable=False)
+
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type}:{self.aggregate_id}>'
+
+
+class Notification(db.Model):
+    """Rendered customer email waiting for, or recording, delivery by notifications.py"""
+    __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_due', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    kind = db.Column(db.String(50), nullable=False)  # template name, e.g. 'order_placed'
+    dedupe_key = db.Column(db.String(100), unique=True)  # stops redelivered events queueing twice
+    to_address = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, sent, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    latency_ms = db.Column(db.Integer)  # queued to accepted by the SMTP server
+    send_ms = db.Column(db.Integer)  # time spent in the SMTP transaction itself
+
+    def __repr__(self):
+        return f'<Notification {self.id} {self.kind} to {self.to_address} {self.status}>'
+
+
+class JobLock(db.Model):
+    """One row per scheduled job; nodes claim each run by advancing last_slot"""
+    __tablename__ = 'job_locks'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_slot = db.Column(db.DateTime)  # the scheduled minute most recently claimed
+    owner = db.Column(db.String(100))  # hostname:pid of the node that claimed it
+    claimed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<JobLock {self.name} {self.last_slot} {self.owner}>'
+
+
+class JobRun(db.Model):
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        db.Index('ix_job_runs_job_started', 'job_name', 'started_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(50), nullable=False)
+    owner = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    duration_ms = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False)  # ok, error
+    result = db.Column(db.String(200))  # what the job returned, e.g. a row count
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<JobRun {self.job_name} {self.status} {self.duration_ms}ms>'
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Customer email notifications for e-Nursery
+
+Emails are rendered from templates/emails/ into the notifications table by
+outbox handlers, so nothing is sent inside a web request. This script is
+the dispatcher: an asyncio loop that drains queued notifications in
+batches and sends them over a small pool of SMTP connections that stay
+open between messages and batches. Each row records whether it was sent,
+the attempts made, and its queue and SMTP latency.
+
+For local testing, start a debugging SMTP server that prints every
+message, e.g. ``python -m aiosmtpd -n -l localhost:1025`` (or
+``python -m smtpd -n -c DebuggingServer localhost:1025`` before Python
+3.12), then run:
+    python notifications.py
+"""
+
+import asyncio
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from flask import current_app, render_template, url_for
+
+from models import db, User, Order, Plant, Wishlist, Notification
+from outbox import handler, backoff, MAX_ATTEMPTS
+
+BATCH_SIZE = 50
+POLL_INTERVAL = 2
+SMTP_TIMEOUT = 10
+
+# Back-in-stock fan-out: wishlist rows read per query, and how fast the resulting emails go out
+FANOUT_BATCH_SIZE = 500
+BACK_IN_STOCK_PER_MINUTE = 300
+
+SUBJECTS = {
+    'order_placed': 'Order #{order_id} confirmed',
+    'order_status': 'Order #{order_id}: {to_status}',
+    'back_in_stock': 'Back in stock: {plant_name}',
+}
+# Status changes customers hear about; the rest are internal fulfilment steps
+NOTIFY_STATUSES = {'Shipped', 'Out for Delivery', 'Delivered', 'Cancelled'}
+
+
+def queue_notification(user, kind, dedupe_key=None, send_at=None, check_dedupe=True, **context):
+    """Render a notification into the current transaction; sent once the caller commits.
+
+    ``send_at`` holds it back until then, which is how large fan-outs are throttled.
+    """
+    if not user or not user.email:
+        return None
+    if check_dedupe and dedupe_key and Notification.query.filter_by(dedupe_key=dedupe_key).first():
+        return None
+
+    notification = Notification(
+        user_id=user.id,
+        kind=kind,
+        dedupe_key=dedupe_key,
+        to_address=user.email,
+        subject=SUBJECTS[kind].format(**context),
+        body=render_template(f'emails/{kind}.txt', user=user, **context),
+        available_at=send_at or datetime.utcnow(),
+    )
+    db.session.add(notification)
+    return notification
+
+
+def _external_url(endpoint, **values):
+    with current_app.test_request_context(base_url=current_app.config['SITE_URL']):
+        return url_for(endpoint, _external=True, **values)
+
+
+@handler('order.placed')
+def notify_order_placed(event_id, payload):
+    order = db.session.get(Order, payload['order_id'])
+    if order:
+        queue_notification(db.session.get(User, payload['user_id']), 'order_placed',
+                           dedupe_key=f'outbox:{event_id}', order=order, order_id=order.id,
+                           track_url=_external_url('track_order'))
+
+
+@handler('order.status_changed')
+def notify_order_status(event_id, payload):
+    if payload['to_status'] not in NOTIFY_STATUSES:
+        return
+    order = db.session.get(Order, payload['order_id'])
+    if order:
+        queue_notification(db.session.get(User, payload['user_id']), 'order_status',
+                           dedupe_key=f'outbox:{event_id}', order=order, order_id=order.id,
+                           to_status=payload['to_status'], note=payload.get('note'),
+                           track_url=_external_url('track_order'))
+
+
+def iter_wisher_batches(plant_id, batch_size=FANOUT_BATCH_SIZE):
+    """Yield lists of distinct user ids with ``plant_id`` wishlisted, walking the (plant_id, user_id) index."""
+    last_user_id = 0
+    while True:
+        user_ids = [user_id for (user_id,) in db.session.query(Wishlist.user_id).filter(
+            Wishlist.plant_id == plant_id,
+            Wishlist.user_id > last_user_id
+        ).distinct().order_by(Wishlist.user_id).limit(batch_size)]
+        if not user_ids:
+            return
+        yield user_ids
+        last_user_id = user_ids[-1]
+
+
+@handler('plant.back_in_stock')
+def notify_back_in_stock(event_id, payload):
+    plant = db.session.get(Plant, payload['plant_id'])
+    if not plant or plant.stock == 0:
+        return
+
+    plant_url = _external_url('plant_detail', id=plant.id)
+    interval = timedelta(minutes=1) / BACK_IN_STOCK_PER_MINUTE
+    # The cap covers all restocks together, so queue behind any fan-out still waiting to go out
+    last_queued = db.session.query(db.func.max(Notification.available_at)).filter(
+        Notification.status == 'queued', Notification.kind == 'back_in_stock').scalar()
+    send_at = datetime.utcnow()
+    if last_queued is not None and last_queued + interval > send_at:
+        send_at = last_queued + interval
+
+    for user_ids in iter_wisher_batches(plant.id):
+        keys = {user_id: f'outbox:{event_id}:{user_id}' for user_id in user_ids}
+        already_queued = {key for (key,) in db.session.query(Notification.dedupe_key).filter(
+            Notification.dedupe_key.in_(keys.values()))}
+        for user in User.query.filter(User.id.in_(user_ids)):
+            if keys[user.id] in already_queued:
+                continue
+            queue_notification(user, 'back_in_stock', dedupe_key=keys[user.id], send_at=send_at,
+                               check_dedupe=False, plant=plant, plant_name=plant.name, plant_url=plant_url)
+            send_at += interval
+        db.session.flush()
+
+
+class SMTPPool:
+    """Up to ``size`` concurrent SMTP sends over reusable connections, driven from asyncio.
+
+    smtplib is blocking, so each SMTP exchange runs in a worker thread; the
+    event loop only schedules sends and hands connections back and forth.
+    """
+
+    def __init__(self, host, port, size, use_tls=False, username=None, password=None):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    def _connect(self):
+        conn = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.use_tls:
+                conn.starttls()
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    async def send(self, message):
+        """Send one message, reconnecting once if the server dropped an idle connection."""
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is not None:
+                    try:
+                        await asyncio.to_thread(conn.send_message, message)
+                        return
+                    except smtplib.SMTPServerDisconnected:
+                        conn.close()
+                        conn = None
+                conn = await asyncio.to_thread(self._connect)
+                await asyncio.to_thread(conn.send_message, message)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+                # The server rejected this message; the connection is still good
+                raise
+            except Exception:
+                if conn is not None:
+                    conn.close()
+                    conn = None
+                raise
+            finally:
+                if conn is not None:
+                    self._idle.append(conn)
+
+    async def close(self):
+        while self._idle:
+            conn = self._idle.pop()
+            try:
+                await asyncio.to_thread(conn.quit)
+            except Exception:
+                conn.close()
+
+
+def build_message(notification, sender):
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = notification.to_address
+    message['Subject'] = notification.subject
+    message.set_content(notification.body)
+    return message
+
+
+async def _deliver(pool, notification, sender):
+    started = time.perf_counter()
+    try:
+        await pool.send(build_message(notification, sender))
+    except Exception as e:
+        return notification, None, f'{type(e).__name__}: {e}'
+    return notification, int((time.perf_counter() - started) * 1000), None
+
+
+async def dispatch_batch(pool, sender, batch_size=BATCH_SIZE):
+    """Send one batch of due notifications concurrently and commit the results; returns the batch size."""
+    now = datetime.utcnow()
+    batch = Notification.query.filter(
+        Notification.status == 'queued',
+        Notification.available_at <= now
+    ).order_by(Notification.id).limit(batch_size).all()
+    if not batch:
+        return 0
+
+    results = await asyncio.gather(*[_deliver(pool, notification, sender) for notification in batch])
+
+    finished = datetime.utcnow()
+    for notification, send_ms, error in results:
+        notification.attempts += 1
+        if error is None:
+            notification.status = 'sent'
+            notification.sent_at = finished
+            notification.send_ms = send_ms
+            notification.latency_ms = int((finished - notification.created_at).total_seconds() * 1000)
+            notification.last_error = None
+        else:
+            notification.last_error = error
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = 'failed'
+            else:
+                notification.available_at = finished + backoff(notification.attempts)
+    db.session.commit()
+    return len(batch)
+
+
+async def run_dispatcher(poll_interval=POLL_INTERVAL):
+    config = current_app.config
+    pool = SMTPPool(config['MAIL_SERVER'], config['MAIL_PORT'], config['MAIL_CONNECTIONS'],
+                    config['MAIL_USE_TLS'], config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+    try:
+        while True:
+            if await dispatch_batch(pool, config['MAIL_SENDER']) < BATCH_SIZE:
+                db.session.remove()
+                await asyncio.sleep(poll_interval)
+    finally:
+        await pool.close()
+
+
+def delivery_stats(since):
+    """Counts by status plus average and worst latency (ms) of notifications queued since ``since``."""
+    counts = dict(db.session.query(Notification.status, db.func.count(Notification.id)).filter(
+        Notification.created_at >= since).group_by(Notification.status).all())
+    avg_latency, max_latency, avg_send = db.session.query(
+        db.func.avg(Notification.latency_ms), db.func.max(Notification.latency_ms), db.func.avg(Notification.send_ms)
+    ).filter(Notification.created_at >= since, Notification.status == 'sent').one()
+    return {
+        'queued': counts.get('queued', 0),
+        'sent': counts.get('sent', 0),
+        'failed': counts.get('failed', 0),
+        'avg_latency_ms': avg_latency,
+        'max_latency_ms': max_latency,
+        'avg_send_ms': avg_send,
+    }
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        print(f"📧 Dispatching notifications via {app.config['MAIL_SERVER']}:{app.config['MAIL_PORT']}")
+        asyncio.run(run_dispatcher())
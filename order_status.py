@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import datetime
+
+from models import db, Order, OrderStatusEvent
+from outbox import emit, emit_many
+
+# The normal fulfilment path, in order
+STATUS_FLOW = ['Pending', 'Confirmed', 'Packed', 'Shipped', 'Out for Delivery', 'Delivered']
+ORDER_STATUSES = STATUS_FLOW + ['Cancelled']
+
+# Orders may move forward any number of steps, and be cancelled until they ship
+TRANSITIONS = {
+    status: set(STATUS_FLOW[i + 1:]) | ({'Cancelled'} if i < STATUS_FLOW.index('Shipped') else set())
+    for i, status in enumerate(STATUS_FLOW)
+}
+TRANSITIONS['Cancelled'] = set()
+
+
+# Orders per UPDATE ... WHERE id IN (...) in bulk changes
+BULK_BATCH_SIZE = 500
+
+
+class InvalidStatusTransition(ValueError):
+    pass
+
+
+def can_transition(from_status, to_status):
+    return to_status in TRANSITIONS.get(from_status, ())
+
+
+def start_order(order, changed_by=None):
+    """Record the creation event of a new (flushed) order."""
+    order.order_status = STATUS_FLOW[0]
+    db.session.add(OrderStatusEvent(order_id=order.id, from_status=None, to_status=order.order_status,
+                                    changed_by=changed_by))
+    emit('order.placed', order.id, {
+        'order_id': order.id,
+        'user_id': order.user_id,
+        'tracking_number': order.tracking_number,
+        'total_amount': order.total_amount,
+        'payment_method': order.payment_method,
+    })
+
+
+def _status_payload(order_id, user_id, tracking_number, from_status, to_status, note):
+    return {
+        'order_id': order_id,
+        'user_id': user_id,
+        'tracking_number': tracking_number,
+        'from_status': from_status,
+        'to_status': to_status,
+        'note': note,
+    }
+
+
+def change_status(order, to_status, changed_by=None, note=None):
+    """Move an order to ``to_status`` and append the event.
+
+    Raises InvalidStatusTransition if the state machine doesn't allow it.
+    """
+    if not can_transition(order.order_status, to_status):
+        raise InvalidStatusTransition(f'Cannot move order from {order.order_status} to {to_status}')
+
+    event = OrderStatusEvent(order_id=order.id, from_status=order.order_status, to_status=to_status,
+                             changed_by=changed_by, note=note, created_at=datetime.utcnow())
+    emit('order.status_changed', order.id, _status_payload(order.id, order.user_id, order.tracking_number,
+                                                           order.order_status, to_status, note))
+    order.order_status = to_status
+    db.session.add(event)
+    return event
+
+
+def bulk_change_status(to_status, order_ids=None, from_status=None, changed_by=None, note=None):
+    """Move many orders to ``to_status`` at once.
+
+    Orders are chosen by id, by current status, or both. Those whose current
+    status can't move to ``to_status`` are skipped. Each batch is one UPDATE
+    guarded by the allowed source statuses plus one bulk insert of events;
+    the caller commits. Returns (updated_ids, skipped_count).
+    """
+    allowed_from = [status for status, targets in TRANSITIONS.items() if to_status in targets]
+    if from_status:
+        allowed_from = [status for status in allowed_from if status == from_status]
+
+    query = db.session.query(Order.id, Order.order_status, Order.user_id, Order.tracking_number)
+    if order_ids is not None:
+        query = query.filter(Order.id.in_(order_ids))
+    if from_status:
+        query = query.filter(Order.order_status == from_status)
+    candidates = query.with_for_update().all()
+    requested = len(set(order_ids)) if order_ids is not None else len(candidates)
+
+    movable = [candidate for candidate in candidates if candidate.order_status in allowed_from]
+    now = datetime.utcnow()
+    updated = []
+    for start in range(0, len(movable), BULK_BATCH_SIZE):
+        batch = movable[start:start + BULK_BATCH_SIZE]
+        batch_ids = [candidate.id for candidate in batch]
+        db.session.execute(
+            db.update(Order).where(Order.id.in_(batch_ids),
+                                   Order.order_status.in_(allowed_from)).values(order_status=to_status),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.execute(db.insert(OrderStatusEvent), [{
+            'order_id': candidate.id,
+            'from_status': candidate.order_status,
+            'to_status': to_status,
+            'changed_by': changed_by,
+            'note': note,
+            'created_at': now,
+        } for candidate in batch])
+        emit_many('order.status_changed', [
+            (candidate.id, _status_payload(candidate.id, candidate.user_id, candidate.tracking_number,
+                                           candidate.order_status, to_status, note))
+            for candidate in batch
+        ])
+        updated.extend(batch_ids)
+
+    return updated, requested - len(updated)
+
+
+def order_timeline(order_id):
+    """All of an order's events, oldest first, from one range scan of the (order_id, created_at) index."""
+    return OrderStatusEvent.query.filter_by(order_id=order_id).order_by(
+        OrderStatusEvent.created_at, OrderStatusEvent.id).all()
+
+
+def time_in_status(since):
+    """Average hours spent in each status, over statuses entered on or after ``since``.
+
+    One query: lead() over each order's events gives the time the next
+    status began.
+    """
+    left_at = db.func.lead(OrderStatusEvent.created_at, type_=db.DateTime).over(
+        partition_by=OrderStatusEvent.order_id,
+        order_by=(OrderStatusEvent.created_at, OrderStatusEvent.id)
+    )
+    spans = db.session.query(
+        OrderStatusEvent.to_status, OrderStatusEvent.created_at, left_at.label('left_at')
+    ).filter(OrderStatusEvent.created_at >= since).subquery()
+
+    hours = defaultdict(list)
+    for status, entered_at, left in db.session.query(spans).filter(spans.c.left_at.isnot(None)):
+        hours[status].append((left - entered_at).total_seconds() / 3600)
+
+    # (status, average hours, number of orders) along the fulfilment path
+    return [(status, sum(hours[status]) / len(hours[status]), len(hours[status]))
+            for status in STATUS_FLOW if hours[status]]
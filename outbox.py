@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Transactional outbox worker for e-Nursery
+
+Order changes call emit() inside their own transaction, so an event exists
+exactly when the change it describes was committed. This worker drains the
+outbox_events table in batches and passes each event to the handlers
+registered for its type. Delivery is at-least-once: a batch is marked done
+only after its handlers return, so handlers must tolerate seeing the same
+event twice (the event id is a natural dedupe key). Failed events are
+retried with exponential backoff until MAX_ATTEMPTS.
+
+Run alongside the web app:
+    python outbox.py
+"""
+
+import json
+import random
+import time
+import traceback
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from models import db, OutboxEvent
+
+BATCH_SIZE = 100
+POLL_INTERVAL = 2  # seconds to sleep when the outbox is empty
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 30  # seconds before the first retry, doubled on each further failure
+BACKOFF_MAX = 3600
+KEEP_PROCESSED_DAYS = 7
+
+_handlers = defaultdict(list)
+
+
+def handler(event_type):
+    """Register a function(event_id, payload) for an event type; '*' receives every event.
+
+    Handlers run in the worker, outside any web request.
+    """
+    def register(func):
+        _handlers[event_type].append(func)
+        return func
+    return register
+
+
+def emit(event_type, aggregate_id, payload):
+    """Queue an event in the current transaction; it is only delivered if the caller commits."""
+    db.session.add(OutboxEvent(event_type=event_type, aggregate_id=aggregate_id,
+                               payload=json.dumps(payload, default=str)))
+
+
+def emit_many(event_type, events):
+    """Bulk emit() for (aggregate_id, payload) pairs."""
+    now = datetime.utcnow()
+    rows = [{
+        'event_type': event_type,
+        'aggregate_id': aggregate_id,
+        'payload': json.dumps(payload, default=str),
+        'created_at': now,
+        'available_at': now,
+        'attempts': 0,
+        'failed': False,
+    } for aggregate_id, payload in events]
+    if rows:
+        db.session.execute(db.insert(OutboxEvent), rows)
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``, with jitter so failed batches don't retry in lockstep."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def deliver(event):
+    payload = json.loads(event.payload)
+    for func in _handlers[event.event_type] + _handlers['*']:
+        func(event.id, payload)
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Deliver one batch of due events and commit their outcome; returns the number attempted."""
+    now = datetime.utcnow()
+    events = OutboxEvent.query.filter(
+        OutboxEvent.processed_at.is_(None),
+        OutboxEvent.available_at <= now
+    ).order_by(OutboxEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+
+    for event in events:
+        # A savepoint per event, so a handler's failed flush can't poison the rest of the batch
+        savepoint = db.session.begin_nested()
+        try:
+            deliver(event)
+            savepoint.commit()
+        except Exception:
+            savepoint.rollback()
+            event.attempts += 1
+            event.last_error = traceback.format_exc(limit=5)
+            if event.attempts >= MAX_ATTEMPTS:
+                event.failed = True
+                event.processed_at = now
+            else:
+                event.available_at = now + backoff(event.attempts)
+        else:
+            event.processed_at = now
+
+    db.session.commit()
+    return len(events)
+
+
+def purge_processed(days=KEEP_PROCESSED_DAYS):
+    """Delete delivered events older than ``days``; failed ones are kept for inspection."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    count = OutboxEvent.query.filter(
+        OutboxEvent.processed_at < cutoff,
+        OutboxEvent.failed.is_(False)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def run_worker(poll_interval=POLL_INTERVAL):
+    while True:
+        while process_batch() == BATCH_SIZE:
+            pass
+        db.session.remove()
+        time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    from app import app
+    # Handlers register on the importable module, not on this __main__ copy
+    import outbox
+    import notifications  # noqa: F401
+
+    with app.app_context():
+        print("📬 Outbox worker started")
+        outbox.run_worker()
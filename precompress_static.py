@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Precompress static assets for e-Nursery
+
+Writes a .gz (and a .br when the brotli package is installed) next to every
+CSS, JS and SVG file under static/. CompressionMiddleware serves these
+siblings directly, so static files are never compressed per request.
+
+Run after changing static files:
+    python precompress_static.py
+"""
+
+import gzip
+import os
+import sys
+
+from compression import brotli
+
+STATIC_FOLDER = 'static'
+EXTENSIONS = ('.css', '.js', '.svg')
+
+
+def is_stale(source, target):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def precompress_file(path):
+    written = []
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if is_stale(path, path + '.gz'):
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        written.append(path + '.gz')
+
+    if brotli is not None and is_stale(path, path + '.br'):
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        written.append(path + '.br')
+
+    return written
+
+
+def precompress_static(folder=STATIC_FOLDER):
+    written = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(EXTENSIONS):
+                written.extend(precompress_file(os.path.join(root, name)))
+    return written
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else STATIC_FOLDER
+    written = precompress_static(folder)
+    for path in written:
+        print(f"✓ {path}")
+    if brotli is None:
+        print("⚠️  brotli not installed, only .gz files were written")
+    print(f"\n✅ {len(written)} precompressed file(s) written")
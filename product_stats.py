@@ -0,0 +1,72 @@
+from sqlalchemy import func, select
+
+from models import db, Plant, Ingredient, OrderItem, Wishlist, Review
+from archive import all_order_lines
+from catalog_index import bump_catalog_version
+
+BATCH_SIZE = 500
+
+
+def record_sale(product, quantity):
+    """Keep the denormalized units_sold counter in step with an order line."""
+    product.units_sold = (product.units_sold or 0) + quantity
+
+
+def record_cancellations(order_ids):
+    """Take the lines of orders just moved to Cancelled back out of units_sold."""
+    order_ids = list(order_ids)
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        lines = db.session.query(OrderItem.item_type, OrderItem.item_id, func.sum(OrderItem.quantity)).filter(
+            OrderItem.order_id.in_(order_ids[start:start + BATCH_SIZE])
+        ).group_by(OrderItem.item_type, OrderItem.item_id).all()
+        for item_type, item_id, quantity in lines:
+            product = db.session.get(Plant if item_type == 'plant' else Ingredient, item_id)
+            if product:
+                record_sale(product, -quantity)
+
+
+def record_wishlist_change(plant, delta):
+    plant.wishlist_count = max((plant.wishlist_count or 0) + delta, 0)
+
+
+def record_review(plant, rating):
+    count = plant.review_count or 0
+    total = (plant.rating_average or 0) * count + rating
+    plant.review_count = count + 1
+    plant.rating_average = total / plant.review_count
+    column = f'rating_{rating}_count'
+    setattr(plant, column, (getattr(plant, column) or 0) + 1)
+
+
+def recalculate_product_stats():
+    """Rebuild every denormalized counter from the source tables.
+
+    Used after seeding, bulk imports and nightly; normal traffic keeps the
+    counters current through the record_* helpers above. Bumps the catalog
+    version so workers re-sort on the rebuilt counters.
+    """
+    lines = all_order_lines()
+    for model, item_type in ((Plant, 'plant'), (Ingredient, 'ingredient')):
+        units_sold = select(func.coalesce(func.sum(lines.c.quantity), 0)).where(
+            lines.c.item_type == item_type,
+            lines.c.item_id == model.id,
+            lines.c.order_status != 'Cancelled'
+        ).scalar_subquery()
+        db.session.execute(db.update(model).values(units_sold=units_sold))
+
+    wishlist_count = select(func.count(Wishlist.id)).where(Wishlist.plant_id == Plant.id).scalar_subquery()
+    review_count = select(func.count(Review.id)).where(Review.plant_id == Plant.id).scalar_subquery()
+    rating_average = select(func.coalesce(func.avg(Review.rating), 0)).where(
+        Review.plant_id == Plant.id).scalar_subquery()
+    histogram = {
+        f'rating_{stars}_count': select(func.count(Review.id)).where(
+            Review.plant_id == Plant.id, Review.rating == stars).scalar_subquery()
+        for stars in range(1, 6)
+    }
+    db.session.execute(db.update(Plant).values(
+        wishlist_count=wishlist_count,
+        review_count=review_count,
+        rating_average=rating_average,
+        **histogram
+    ))
+    bump_catalog_version()
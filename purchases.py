@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Verified purchase index for e-Nursery
+
+Maps each customer to the products they have received, so review
+eligibility and "verified buyer" badges are primary-key lookups. Order
+status changes keep it current; to rebuild it from order history, e.g.
+on a database that predates it:
+    python purchases.py
+"""
+
+from datetime import datetime
+
+from models import db, Order, OrderItem, OrderStatusEvent, VerifiedPurchase
+from archive import all_order_lines
+
+BATCH_SIZE = 500
+
+
+def has_purchased(user_id, item_type, item_id):
+    """Whether the user has received this product, as a single primary-key lookup."""
+    return db.session.get(VerifiedPurchase, (user_id, item_type, item_id)) is not None
+
+
+def verified_buyers(item_type, item_id, user_ids):
+    """The subset of ``user_ids`` who have received this product."""
+    if not user_ids:
+        return set()
+    return {user_id for (user_id,) in db.session.query(VerifiedPurchase.user_id).filter(
+        VerifiedPurchase.user_id.in_(set(user_ids)),
+        VerifiedPurchase.item_type == item_type,
+        VerifiedPurchase.item_id == item_id
+    )}
+
+
+def record_delivery(order, delivered_at=None):
+    """Add the order's products to the customer's verified purchases."""
+    delivered_at = delivered_at or datetime.utcnow()
+    keys = {(item.item_type, item.item_id) for item in order.order_items}
+    for item_type, item_id in keys:
+        if db.session.get(VerifiedPurchase, (order.user_id, item_type, item_id)) is None:
+            db.session.add(VerifiedPurchase(user_id=order.user_id, item_type=item_type, item_id=item_id,
+                                            order_id=order.id, delivered_at=delivered_at))
+
+
+def record_deliveries(order_ids, delivered_at=None):
+    """Bulk record_delivery for many orders, with one read and one insert per batch."""
+    delivered_at = delivered_at or datetime.utcnow()
+    new_rows = {}
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        batch = order_ids[start:start + BATCH_SIZE]
+        for user_id, item_type, item_id, order_id in db.session.query(
+            Order.user_id, OrderItem.item_type, OrderItem.item_id, Order.id
+        ).join(OrderItem).filter(Order.id.in_(batch)).order_by(Order.id):
+            new_rows.setdefault((user_id, item_type, item_id), order_id)
+
+    user_ids = sorted({user_id for user_id, _, _ in new_rows})
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        for key in db.session.query(VerifiedPurchase.user_id, VerifiedPurchase.item_type, VerifiedPurchase.item_id).filter(
+                VerifiedPurchase.user_id.in_(user_ids[start:start + BATCH_SIZE])):
+            new_rows.pop(tuple(key), None)
+
+    if new_rows:
+        db.session.execute(db.insert(VerifiedPurchase), [{
+            'user_id': user_id,
+            'item_type': item_type,
+            'item_id': item_id,
+            'order_id': order_id,
+            'delivered_at': delivered_at,
+        } for (user_id, item_type, item_id), order_id in new_rows.items()])
+
+
+def rebuild_verified_purchases():
+    """Rebuild the whole table from delivered orders, archived ones included, e.g. after seeding or imports.
+
+    Returns the number of rows; the caller commits.
+    """
+    lines = all_order_lines()
+    # When the order went Delivered; orders from before status history fall back to their dates
+    delivered = db.session.query(
+        OrderStatusEvent.order_id, db.func.min(OrderStatusEvent.created_at).label('delivered_at')
+    ).filter(OrderStatusEvent.to_status == 'Delivered').group_by(OrderStatusEvent.order_id).subquery()
+    delivered_at = db.func.coalesce(delivered.c.delivered_at, lines.c.estimated_delivery, lines.c.created_at)
+    rows = db.session.query(
+        lines.c.user_id, lines.c.item_type, lines.c.item_id,
+        db.func.min(lines.c.order_id), db.func.min(delivered_at, type_=db.DateTime)
+    ).outerjoin(delivered, delivered.c.order_id == lines.c.order_id).filter(
+        lines.c.order_status == 'Delivered'
+    ).group_by(lines.c.user_id, lines.c.item_type, lines.c.item_id).all()
+
+    db.session.query(VerifiedPurchase).delete()
+    if rows:
+        db.session.execute(db.insert(VerifiedPurchase), [{
+            'user_id': user_id,
+            'item_type': item_type,
+            'item_id': item_id,
+            'order_id': order_id,
+            'delivered_at': delivered_at,
+        } for user_id, item_type, item_id, order_id, delivered_at in rows])
+    return len(rows)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        count = rebuild_verified_purchases()
+        db.session.commit()
+    print(f"✅ {count} verified purchase(s) indexed")
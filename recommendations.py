@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Build "frequently bought together" recommendations for e-Nursery
+
+Mines OrderItem co-occurrence across non-cancelled orders and stores the
+top-K neighbours of every product (plants and ingredients) in the
+product_recommendations table, which the detail pages read.
+
+Run periodically:
+    python recommendations.py
+"""
+
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from models import db, Order, OrderItem, ProductRecommendation
+
+TOP_K = 8
+BATCH_SIZE = 10000
+# Very large baskets (bulk/B2B orders) say little about affinity and cost O(n^2)
+MAX_BASKET_SIZE = 50
+
+
+def iter_baskets():
+    """Yield the set of (item_type, item_id) per order, streaming rows in order_id order"""
+    rows = db.session.query(OrderItem.order_id, OrderItem.item_type, OrderItem.item_id).join(Order).filter(
+        Order.order_status != 'Cancelled'
+    ).order_by(OrderItem.order_id).execution_options(yield_per=BATCH_SIZE)
+
+    current_order, basket = None, set()
+    for order_id, item_type, item_id in rows:
+        if order_id != current_order:
+            if basket:
+                yield basket
+            current_order, basket = order_id, set()
+        basket.add((item_type, item_id))
+    if basket:
+        yield basket
+
+
+def count_co_purchases(baskets):
+    """Sparse symmetric co-occurrence counts, keyed by integer product codes"""
+    codes = {}
+    products = []
+    co_counts = defaultdict(Counter)
+
+    for basket in baskets:
+        if len(basket) < 2 or len(basket) > MAX_BASKET_SIZE:
+            continue
+        basket_codes = []
+        for product in basket:
+            if product not in codes:
+                codes[product] = len(products)
+                products.append(product)
+            basket_codes.append(codes[product])
+        basket_codes.sort()
+        for i, a in enumerate(basket_codes):
+            row = co_counts[a]
+            for b in basket_codes[i + 1:]:
+                row[b] += 1
+                co_counts[b][a] += 1
+
+    return products, co_counts
+
+
+def top_neighbours(products, co_counts, top_k=TOP_K):
+    """Top-K neighbours of each product, per neighbour type"""
+    for code, row in co_counts.items():
+        item_type, item_id = products[code]
+        by_type = defaultdict(list)
+        for other, count in row.items():
+            by_type[products[other][0]].append((count, -products[other][1], other))
+        for rec_type, candidates in by_type.items():
+            for rank, (count, _, other) in enumerate(heapq.nlargest(top_k, candidates)):
+                yield {
+                    'item_type': item_type,
+                    'item_id': item_id,
+                    'rec_type': rec_type,
+                    'rec_id': products[other][1],
+                    'score': count,
+                    'rank': rank,
+                }
+
+
+def recommended_products(model, item_type, item_id, limit=4):
+    """Precomputed neighbours of one product that are of ``model``'s type, in stock, best first"""
+    rec_type = 'plant' if model.__tablename__ == 'plants' else 'ingredient'
+    return model.query.join(ProductRecommendation, db.and_(
+        ProductRecommendation.rec_id == model.id,
+        ProductRecommendation.rec_type == rec_type
+    )).filter(
+        ProductRecommendation.item_type == item_type,
+        ProductRecommendation.item_id == item_id,
+        model.stock > 0
+    ).order_by(ProductRecommendation.rank).limit(limit).all()
+
+
+def build_recommendations(top_k=TOP_K):
+    """Recompute the whole recommendations table in one transaction"""
+    products, co_counts = count_co_purchases(iter_baskets())
+    rows = list(top_neighbours(products, co_counts, top_k))
+    now = datetime.utcnow()
+    for row in rows:
+        row['created_at'] = now
+
+    db.session.query(ProductRecommendation).delete()
+    if rows:
+        db.session.execute(db.insert(ProductRecommendation), rows)
+    db.session.commit()
+    return len(rows)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        count = build_recommendations()
+    print(f"✅ {count} recommendation(s) written")
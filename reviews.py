@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
+
+from models import Review
+
+REVIEWS_PER_PAGE = 10
+
+# Sort name -> keyset columns as (column, descending); created_at and id break ties
+REVIEW_SORTS = {
+    'newest': [(Review.created_at, True), (Review.id, True)],
+    'highest': [(Review.rating, True), (Review.created_at, True), (Review.id, True)],
+    'lowest': [(Review.rating, False), (Review.created_at, True), (Review.id, True)],
+}
+
+
+def _cursor_values(review, sort):
+    return [getattr(review, column.key) for column, _ in REVIEW_SORTS[sort]]
+
+
+def encode_cursor(review, sort):
+    parts = []
+    for value in _cursor_values(review, sort):
+        parts.append(value.isoformat() if isinstance(value, datetime) else str(value))
+    return '_'.join(parts)
+
+
+def decode_cursor(cursor, sort):
+    """Parse a cursor from encode_cursor, raising ValueError if it is malformed"""
+    parts = cursor.split('_')
+    columns = REVIEW_SORTS[sort]
+    if len(parts) != len(columns):
+        raise ValueError('bad cursor')
+    values = []
+    for (column, _), part in zip(columns, parts):
+        values.append(datetime.fromisoformat(part) if column.key == 'created_at' else int(part))
+    return values
+
+
+def _after(columns, values):
+    """WHERE clause for rows strictly after ``values`` in the given sort order"""
+    clauses = []
+    for i, (column, descending) in enumerate(columns):
+        equal = [col == value for (col, _), value in zip(columns[:i], values[:i])]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+
+def review_page(plant_id, sort='newest', cursor=None, limit=REVIEWS_PER_PAGE):
+    """Return (reviews, next_cursor) for one page of a plant's reviews.
+
+    Pages are keyset-based, so deep pages cost the same as the first one.
+    next_cursor is None on the last page.
+    """
+    if sort not in REVIEW_SORTS:
+        sort = 'newest'
+    columns = REVIEW_SORTS[sort]
+
+    query = Review.query.options(joinedload(Review.user)).filter(Review.plant_id == plant_id)
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, sort)))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in columns])
+
+    reviews = query.limit(limit + 1).all()
+    next_cursor = encode_cursor(reviews[limit - 1], sort) if len(reviews) > limit else None
+    return reviews[:limit], next_cursor
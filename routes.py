@@ -1,13 +1,29 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_from_directory
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_from_directory, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
-from models import db, User, Plant, Ingredient, Cart, Order, OrderItem, Wishlist, Review
+from models import db, User, Plant, Ingredient, Cart, Order, OrderItem, Wishlist, Review, CustomerSegment
+from catalog_index import get_catalog_index, bump_catalog_version, load_products, SORT_OPTIONS
+from product_stats import record_sale, record_cancellations, record_wishlist_change, record_review
+from search_index import get_prefix_index, search_product_ids
+from recommendations import recommended_products
+from reviews import review_page
+from purchases import has_purchased, verified_buyers, record_delivery, record_deliveries
+from order_status import (STATUS_FLOW, ORDER_STATUSES, InvalidStatusTransition, can_transition, change_status,
+                          bulk_change_status, start_order, time_in_status)
+from archive import order_history, has_archived_orders, find_order, all_orders
+from notifications import delivery_stats
+from outbox import emit
+from scheduler import job_stats
+from tracking import lookup_tracking, forget_tracking, forget_orders, limiter as tracking_limiter
+from segments import SEGMENTS
 from datetime import datetime, timedelta
 from sqlalchemy import or_, func
+from sqlalchemy.orm import contains_eager, joinedload, undefer, undefer_group
 import os
 
 UPLOAD_FOLDER = 'static/uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+MAX_BULK_ORDER_IDS = 5000  # order ids accepted by one bulk status request
 
 
 def allowed_file(filename):
@@ -19,9 +35,10 @@ def init_routes(app):
 
     @app.route('/')
     def index():
-        plants = Plant.query.filter(Plant.stock > 0).limit(8).all()
-        ingredients = Ingredient.query.filter(Ingredient.stock > 0).limit(4).all()
-        categories = db.session.query(Plant.category, func.count(Plant.id)).group_by(Plant.category).all()
+        plants = Plant.query.options(undefer(Plant.description)).filter(Plant.stock > 0).limit(8).all()
+        ingredients = Ingredient.query.options(undefer(Ingredient.description)).filter(Ingredient.stock > 0).limit(4).all()
+        plant_index = get_catalog_index('plant')
+        categories = list(plant_index.facet_counts(plant_index.all_bits).items())
         return render_template('index.html', plants=plants, ingredients=ingredients, categories=categories)
 
     @app.route('/about')
@@ -120,45 +137,71 @@ def init_routes(app):
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
         in_stock = request.args.get('in_stock')
+        sort = request.args.get('sort')
 
-        query = Plant.query
-
-        if category:
-            query = query.filter_by(category=category)
+        index = get_catalog_index('plant')
 
+        search_ids, fuzzy_search = None, False
         if search:
-            query = query.filter(or_(
-                Plant.name.ilike(f'%{search}%'),
-                Plant.description.ilike(f'%{search}%')
-            ))
-
-        if min_price is not None:
-            query = query.filter(Plant.price >= min_price)
-
-        if max_price is not None:
-            query = query.filter(Plant.price <= max_price)
+            search_ids, fuzzy_search = search_product_ids('plant', search)
 
-        if in_stock == 'true':
-            query = query.filter(Plant.stock > 0)
+        matches, facet_counts = index.facet_summary(category, min_price, max_price, in_stock == 'true', ids=search_ids)
+        plant_ids = index.ids_for(matches, sort)
+        if search_ids and not sort:
+            # Keep search relevance order unless the customer picked a sort
+            rank = {plant_id: n for n, plant_id in enumerate(search_ids)}
+            plant_ids.sort(key=rank.__getitem__)
+        plants = load_products(Plant, plant_ids, undefer(Plant.description))
+        categories = index.facet_names
 
-        plants = query.all()
-        categories = db.session.query(Plant.category).distinct().all()
-
-        return render_template('plants.html', plants=plants, categories=[c[0] for c in categories])
+        return render_template('plants.html', plants=plants, categories=categories, facet_counts=facet_counts,
+                               sort_options=SORT_OPTIONS['plant'], fuzzy_search=fuzzy_search)
 
     @app.route('/plant/<int:id>')
     def plant_detail(id):
-        plant = Plant.query.get_or_404(id)
-        reviews = Review.query.filter_by(plant_id=id).order_by(Review.created_at.desc()).all()
-        related_plants = Plant.query.filter(Plant.category == plant.category, Plant.id != id, Plant.stock > 0).limit(
-            4).all()
+        plant = Plant.query.options(undefer_group('details')).get_or_404(id)
+        review_sort = request.args.get('review_sort', 'newest')
+        reviews, next_cursor = review_page(id, review_sort)
+        related_plants = recommended_products(Plant, 'plant', id)
+        if len(related_plants) < 4:
+            # Top up with same-category plants when there's little order history
+            exclude = [id] + [p.id for p in related_plants]
+            related_plants += Plant.query.filter(Plant.category == plant.category, Plant.id.notin_(exclude),
+                                                 Plant.stock > 0).limit(4 - len(related_plants)).all()
+        bought_together = recommended_products(Ingredient, 'plant', id)
 
         user_wishlist = None
+        can_review = False
         if current_user.is_authenticated:
             user_wishlist = Wishlist.query.filter_by(user_id=current_user.id, plant_id=id).first()
-
-        return render_template('plant_detail.html', plant=plant, reviews=reviews, related_plants=related_plants,
-                               user_wishlist=user_wishlist)
+            can_review = has_purchased(current_user.id, 'plant', id) and not Review.query.filter_by(
+                user_id=current_user.id, plant_id=id).first()
+        verified = verified_buyers('plant', id, [review.user_id for review in reviews])
+
+        return render_template('plant_detail.html', plant=plant, reviews=reviews, next_cursor=next_cursor,
+                               review_sort=review_sort, verified=verified, can_review=can_review,
+                               related_plants=related_plants,
+                               bought_together=bought_together, user_wishlist=user_wishlist)
+
+    @app.route('/plant/<int:id>/reviews')
+    def plant_reviews(id):
+        sort = request.args.get('sort', 'newest')
+        try:
+            reviews, next_cursor = review_page(id, sort, request.args.get('after'))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        verified = verified_buyers('plant', id, [review.user_id for review in reviews])
+
+        return jsonify({
+            'reviews': [{
+                'author': review.user.full_name or review.user.username,
+                'rating': review.rating,
+                'verified': review.user_id in verified,
+                'comment': review.comment,
+                'created_at': review.created_at.strftime('%d-%m-%Y'),
+            } for review in reviews],
+            'next_cursor': next_cursor,
+        })
 
     # ==================== INGREDIENTS ====================
 
@@ -169,39 +212,55 @@ def init_routes(app):
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
         in_stock = request.args.get('in_stock')
+        sort = request.args.get('sort')
 
-        query = Ingredient.query
-
-        if type_filter:
-            query = query.filter_by(type=type_filter)
+        index = get_catalog_index('ingredient')
 
+        search_ids, fuzzy_search = None, False
         if search:
-            query = query.filter(or_(
-                Ingredient.name.ilike(f'%{search}%'),
-                Ingredient.description.ilike(f'%{search}%')
-            ))
-
-        if min_price is not None:
-            query = query.filter(Ingredient.price >= min_price)
-
-        if max_price is not None:
-            query = query.filter(Ingredient.price <= max_price)
+            search_ids, fuzzy_search = search_product_ids('ingredient', search)
 
-        if in_stock == 'true':
-            query = query.filter(Ingredient.stock > 0)
+        matches, facet_counts = index.facet_summary(type_filter, min_price, max_price, in_stock == 'true',
+                                                    ids=search_ids)
+        ingredient_ids = index.ids_for(matches, sort)
+        if search_ids and not sort:
+            # Keep search relevance order unless the customer picked a sort
+            rank = {ingredient_id: n for n, ingredient_id in enumerate(search_ids)}
+            ingredient_ids.sort(key=rank.__getitem__)
+        ingredients = load_products(Ingredient, ingredient_ids, undefer(Ingredient.description))
+        types = index.facet_names
 
-        ingredients = query.all()
-        types = db.session.query(Ingredient.type).distinct().all()
-
-        return render_template('ingredients.html', ingredients=ingredients, types=[t[0] for t in types])
+        return render_template('ingredients.html', ingredients=ingredients, types=types, facet_counts=facet_counts,
+                               sort_options=SORT_OPTIONS['ingredient'], fuzzy_search=fuzzy_search)
 
     @app.route('/ingredient/<int:id>')
     def ingredient_detail(id):
-        ingredient = Ingredient.query.get_or_404(id)
-        related_ingredients = Ingredient.query.filter(Ingredient.type == ingredient.type, Ingredient.id != id,
-                                                      Ingredient.stock > 0).limit(4).all()
+        ingredient = Ingredient.query.options(undefer_group('details')).get_or_404(id)
+        related_ingredients = recommended_products(Ingredient, 'ingredient', id)
+        if len(related_ingredients) < 4:
+            # Top up with same-type supplies when there's little order history
+            exclude = [id] + [i.id for i in related_ingredients]
+            related_ingredients += Ingredient.query.filter(Ingredient.type == ingredient.type,
+                                                           Ingredient.id.notin_(exclude),
+                                                           Ingredient.stock > 0).limit(4 - len(related_ingredients)).all()
         return render_template('ingredient_detail.html', ingredient=ingredient, related_ingredients=related_ingredients)
 
+    # ==================== SEARCH ====================
+
+    @app.route('/search/suggest')
+    def search_suggest():
+        urls = {
+            'plant': lambda key: url_for('plant_detail', id=key),
+            'ingredient': lambda key: url_for('ingredient_detail', id=key),
+            'category': lambda key: url_for('plants', category=key),
+            'type': lambda key: url_for('ingredients', type=key),
+        }
+        suggestions = get_prefix_index().lookup(request.args.get('q', ''))
+        return jsonify([
+            {'label': label, 'kind': kind, 'url': urls[kind](key)}
+            for kind, key, label, _ in suggestions
+        ])
+
     # ==================== CART ====================
 
     @app.route('/cart')
@@ -350,6 +409,7 @@ def init_routes(app):
 
         db.session.add(order)
         db.session.flush()
+        start_order(order, changed_by=current_user.id)
 
         # Create order items and reduce stock
         for item in cart_items:
@@ -368,12 +428,14 @@ def init_routes(app):
 
             # Reduce stock
             product.stock -= item.quantity
+            record_sale(product, item.quantity)
 
         # Clear cart
         for item in cart_items:
             db.session.delete(item)
 
         db.session.commit()
+        forget_tracking(order.tracking_number)
 
         flash('Order placed successfully!', 'success')
         return redirect(url_for('order_confirmation', order_id=order.id))
@@ -381,7 +443,7 @@ def init_routes(app):
     @app.route('/order-confirmation/<int:order_id>')
     @login_required
     def order_confirmation(order_id):
-        order = Order.query.get_or_404(order_id)
+        order = Order.query.options(undefer(Order.shipping_address)).get_or_404(order_id)
 
         if order.user_id != current_user.id:
             flash('Unauthorized', 'danger')
@@ -392,13 +454,18 @@ def init_routes(app):
     @app.route('/orders')
     @login_required
     def my_orders():
-        orders = Order.query.filter_by(user_id=current_user.id).order_by(Order.created_at.desc()).all()
-        return render_template('my_orders.html', orders=orders)
+        # Archived orders are only read when the customer asks for their full history
+        include_archived = request.args.get('history') == 'all'
+        orders = order_history(current_user.id, include_archived)
+        show_history_link = not include_archived and has_archived_orders(current_user.id)
+        return render_template('my_orders.html', orders=orders, show_history_link=show_history_link)
 
     @app.route('/order/<int:id>')
     @login_required
     def order_detail(id):
-        order = Order.query.get_or_404(id)
+        order = find_order(id)
+        if order is None:
+            abort(404)
 
         if order.user_id != current_user.id and current_user.role != 'admin':
             flash('Unauthorized', 'danger')
@@ -409,14 +476,17 @@ def init_routes(app):
     @app.route('/track-order', methods=['GET', 'POST'])
     def track_order():
         if request.method == 'POST':
-            tracking_number = request.form.get('tracking_number')
-            order = Order.query.filter_by(tracking_number=tracking_number).first()
+            if not tracking_limiter.allow(request.remote_addr):
+                flash('Too many tracking requests. Please try again in a minute.', 'warning')
+                return render_template('track_order.html', order=None), 429
+
+            order = lookup_tracking(request.form.get('tracking_number'))
 
             if not order:
                 flash('Invalid tracking number', 'danger')
                 return redirect(url_for('track_order'))
 
-            return render_template('track_order.html', order=order)
+            return render_template('track_order.html', order=order, events=order['events'], status_flow=STATUS_FLOW)
 
         return render_template('track_order.html', order=None)
 
@@ -429,7 +499,7 @@ def init_routes(app):
             flash('Unauthorized', 'danger')
             return redirect(url_for('my_orders'))
 
-        if order.order_status in ['Shipped', 'Out for Delivery', 'Delivered']:
+        if not can_transition(order.order_status, 'Cancelled'):
             flash('Cannot cancel order at this stage', 'danger')
             return redirect(url_for('order_detail', id=id))
 
@@ -442,9 +512,11 @@ def init_routes(app):
 
             if product:
                 product.stock += item.quantity
+                record_sale(product, -item.quantity)
 
-        order.order_status = 'Cancelled'
+        change_status(order, 'Cancelled', changed_by=current_user.id, note='Cancelled by customer')
         db.session.commit()
+        forget_tracking(order.tracking_number)
 
         flash('Order cancelled successfully', 'success')
         return redirect(url_for('order_detail', id=id))
@@ -454,7 +526,7 @@ def init_routes(app):
     @app.route('/wishlist')
     @login_required
     def wishlist():
-        wishlist_items = Wishlist.query.filter_by(user_id=current_user.id).all()
+        wishlist_items = Wishlist.query.filter_by(user_id=current_user.id).options(joinedload(Wishlist.plant)).all()
         return render_template('wishlist.html', wishlist_items=wishlist_items)
 
     @app.route('/wishlist/add/<int:plant_id>')
@@ -469,6 +541,7 @@ def init_routes(app):
         else:
             wishlist_item = Wishlist(user_id=current_user.id, plant_id=plant_id)
             db.session.add(wishlist_item)
+            record_wishlist_change(plant, 1)
             db.session.commit()
             flash('Added to wishlist', 'success')
 
@@ -484,6 +557,7 @@ def init_routes(app):
             return redirect(url_for('wishlist'))
 
         db.session.delete(wishlist_item)
+        record_wishlist_change(wishlist_item.plant, -1)
         db.session.commit()
         flash('Removed from wishlist', 'success')
         return redirect(url_for('wishlist'))
@@ -518,6 +592,7 @@ def init_routes(app):
 
         # Remove from wishlist
         db.session.delete(wishlist_item)
+        record_wishlist_change(plant, -1)
         db.session.commit()
 
         flash('Moved to cart', 'success')
@@ -531,14 +606,7 @@ def init_routes(app):
         plant = Plant.query.get_or_404(plant_id)
 
         # Check if user has purchased this plant
-        has_purchased = db.session.query(OrderItem).join(Order).filter(
-            Order.user_id == current_user.id,
-            OrderItem.item_type == 'plant',
-            OrderItem.item_id == plant_id,
-            Order.order_status == 'Delivered'
-        ).first()
-
-        if not has_purchased:
+        if not has_purchased(current_user.id, 'plant', plant_id):
             flash('You can only review products you have purchased and received', 'danger')
             return redirect(url_for('plant_detail', id=plant_id))
 
@@ -549,7 +617,10 @@ def init_routes(app):
             flash('You have already reviewed this product', 'info')
             return redirect(url_for('plant_detail', id=plant_id))
 
-        rating = int(request.form.get('rating'))
+        rating = request.form.get('rating', type=int)
+        if rating is None or not 1 <= rating <= 5:
+            flash('Please choose a rating from 1 to 5', 'danger')
+            return redirect(url_for('plant_detail', id=plant_id))
         comment = request.form.get('comment')
 
         review = Review(
@@ -560,6 +631,9 @@ def init_routes(app):
         )
 
         db.session.add(review)
+        record_review(plant, rating)
+        # Ratings are part of the cached product card, so bump its version
+        plant.updated_at = datetime.utcnow()
         db.session.commit()
 
         flash('Review submitted successfully', 'success')
@@ -578,32 +652,35 @@ def init_routes(app):
         total_users = User.query.filter_by(role='user').count()
         total_plants = Plant.query.count()
         total_ingredients = Ingredient.query.count()
-        total_orders = Order.query.count()
-        total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.order_status != 'Cancelled').scalar() or 0
+        orders = all_orders()
+        total_orders = db.session.query(func.count(orders.c.id)).scalar()
+        total_revenue = db.session.query(func.sum(orders.c.total_amount)).filter(
+            orders.c.order_status != 'Cancelled').scalar() or 0
 
         # Low stock items
-        low_stock_plants = Plant.query.filter(Plant.stock > 0, Plant.stock <= 5).all()
-        low_stock_ingredients = Ingredient.query.filter(Ingredient.stock > 0, Ingredient.stock <= 5).all()
-
-        # Most sold items
+        # Products at or below their forecast reorder point, soonest to run out first
+        low_stock_plants = Plant.query.filter(Plant.stock > 0, Plant.stock <= Plant.reorder_point).order_by(
+            (Plant.stock / db.func.nullif(Plant.daily_demand, 0)).asc().nullslast(), Plant.stock).all()
+        low_stock_ingredients = Ingredient.query.filter(
+            Ingredient.stock > 0, Ingredient.stock <= Ingredient.reorder_point
+        ).order_by((Ingredient.stock / db.func.nullif(Ingredient.daily_demand, 0)).asc().nullslast(),
+                   Ingredient.stock).all()
+
+        # Most sold items, from the units_sold counters so archived orders still count
         most_sold_plant = db.session.query(
-            OrderItem.item_id,
-            Plant.name,
-            func.sum(OrderItem.quantity).label('total_sold')
-        ).join(Plant, OrderItem.item_id == Plant.id).filter(
-            OrderItem.item_type == 'plant'
-        ).group_by(OrderItem.item_id, Plant.name).order_by(func.sum(OrderItem.quantity).desc()).first()
+            Plant.id, Plant.name, Plant.units_sold.label('total_sold')
+        ).filter(Plant.units_sold > 0).order_by(Plant.units_sold.desc(), Plant.id).first()
 
         most_sold_ingredient = db.session.query(
-            OrderItem.item_id,
-            Ingredient.name,
-            func.sum(OrderItem.quantity).label('total_sold')
-        ).join(Ingredient, OrderItem.item_id == Ingredient.id).filter(
-            OrderItem.item_type == 'ingredient'
-        ).group_by(OrderItem.item_id, Ingredient.name).order_by(func.sum(OrderItem.quantity).desc()).first()
+            Ingredient.id, Ingredient.name, Ingredient.units_sold.label('total_sold')
+        ).filter(Ingredient.units_sold > 0).order_by(Ingredient.units_sold.desc(), Ingredient.id).first()
 
-        recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
+        recent_orders = Order.query.options(joinedload(Order.user)).order_by(Order.created_at.desc()).limit(10).all()
+
+        # Fulfilment speed over the last 30 days, from the status history
+        status_durations = time_in_status(datetime.utcnow() - timedelta(days=30))
+        email_stats = delivery_stats(datetime.utcnow() - timedelta(days=1))
+        scheduled_jobs = job_stats(datetime.utcnow() - timedelta(days=7))
 
         return render_template('admin/dashboard.html',
                                total_users=total_users,
@@ -615,7 +692,10 @@ def init_routes(app):
                                low_stock_ingredients=low_stock_ingredients,
                                most_sold_plant=most_sold_plant,
                                most_sold_ingredient=most_sold_ingredient,
-                               recent_orders=recent_orders)
+                               recent_orders=recent_orders,
+                               status_durations=status_durations,
+                               email_stats=email_stats,
+                               scheduled_jobs=scheduled_jobs)
 
     # ==================== ADMIN - PLANTS ====================
 
@@ -638,6 +718,7 @@ def init_routes(app):
 
         if request.method == 'POST':
             name = request.form.get('name')
+            synonyms = request.form.get('synonyms')
             category = request.form.get('category')
             price = float(request.form.get('price'))
             description = request.form.get('description')
@@ -658,6 +739,7 @@ def init_routes(app):
 
             plant = Plant(
                 name=name,
+                synonyms=synonyms,
                 category=category,
                 price=price,
                 description=description,
@@ -669,6 +751,7 @@ def init_routes(app):
             )
 
             db.session.add(plant)
+            bump_catalog_version()
             db.session.commit()
 
             flash('Plant added successfully', 'success')
@@ -683,18 +766,24 @@ def init_routes(app):
             flash('Unauthorized access', 'danger')
             return redirect(url_for('index'))
 
-        plant = Plant.query.get_or_404(id)
+        plant = Plant.query.options(undefer_group('details')).get_or_404(id)
 
         if request.method == 'POST':
             plant.name = request.form.get('name')
+            plant.synonyms = request.form.get('synonyms')
             plant.category = request.form.get('category')
             plant.price = float(request.form.get('price'))
             plant.description = request.form.get('description')
             plant.sunlight = request.form.get('sunlight')
             plant.water = request.form.get('water')
             plant.care_instructions = request.form.get('care_instructions')
+            was_out_of_stock = plant.stock == 0
             plant.stock = int(request.form.get('stock'))
 
+            # Wishlist emails are fanned out by the outbox worker, not in this request
+            if was_out_of_stock and plant.stock > 0:
+                emit('plant.back_in_stock', plant.id, {'plant_id': plant.id})
+
             # Handle file upload
             if 'image' in request.files:
                 file = request.files['image']
@@ -705,6 +794,7 @@ def init_routes(app):
                     plant.image = filename
 
             plant.updated_at = datetime.utcnow()
+            bump_catalog_version()
             db.session.commit()
 
             flash('Plant updated successfully', 'success')
@@ -721,6 +811,7 @@ def init_routes(app):
 
         plant = Plant.query.get_or_404(id)
         db.session.delete(plant)
+        bump_catalog_version()
         db.session.commit()
 
         flash('Plant deleted successfully', 'success')
@@ -747,6 +838,7 @@ def init_routes(app):
 
         if request.method == 'POST':
             name = request.form.get('name')
+            synonyms = request.form.get('synonyms')
             type_ = request.form.get('type')
             price = float(request.form.get('price'))
             description = request.form.get('description')
@@ -765,6 +857,7 @@ def init_routes(app):
 
             ingredient = Ingredient(
                 name=name,
+                synonyms=synonyms,
                 type=type_,
                 price=price,
                 description=description,
@@ -774,6 +867,7 @@ def init_routes(app):
             )
 
             db.session.add(ingredient)
+            bump_catalog_version()
             db.session.commit()
 
             flash('Ingredient added successfully', 'success')
@@ -788,10 +882,11 @@ def init_routes(app):
             flash('Unauthorized access', 'danger')
             return redirect(url_for('index'))
 
-        ingredient = Ingredient.query.get_or_404(id)
+        ingredient = Ingredient.query.options(undefer_group('details')).get_or_404(id)
 
         if request.method == 'POST':
             ingredient.name = request.form.get('name')
+            ingredient.synonyms = request.form.get('synonyms')
             ingredient.type = request.form.get('type')
             ingredient.price = float(request.form.get('price'))
             ingredient.description = request.form.get('description')
@@ -807,6 +902,8 @@ def init_routes(app):
                     file.save(os.path.join(UPLOAD_FOLDER, filename))
                     ingredient.image = filename
 
+            ingredient.updated_at = datetime.utcnow()
+            bump_catalog_version()
             db.session.commit()
 
             flash('Ingredient updated successfully', 'success')
@@ -823,6 +920,7 @@ def init_routes(app):
 
         ingredient = Ingredient.query.get_or_404(id)
         db.session.delete(ingredient)
+        bump_catalog_version()
         db.session.commit()
 
         flash('Ingredient deleted successfully', 'success')
@@ -837,8 +935,8 @@ def init_routes(app):
             flash('Unauthorized access', 'danger')
             return redirect(url_for('index'))
 
-        orders = Order.query.order_by(Order.created_at.desc()).all()
-        return render_template('admin/orders.html', orders=orders)
+        orders = Order.query.options(joinedload(Order.user)).order_by(Order.created_at.desc()).all()
+        return render_template('admin/orders.html', orders=orders, order_statuses=ORDER_STATUSES)
 
     @app.route('/admin/order/<int:id>/update-status', methods=['POST'])
     @login_required
@@ -848,13 +946,75 @@ def init_routes(app):
             return redirect(url_for('index'))
 
         order = Order.query.get_or_404(id)
-        order.order_status = request.form.get('order_status')
+        old_status, new_status = order.order_status, request.form.get('order_status')
+        if new_status == old_status:
+            return redirect(url_for('admin_orders'))
+        try:
+            change_status(order, new_status, changed_by=current_user.id)
+        except InvalidStatusTransition as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('admin_orders'))
+
+        # Keep the verified purchase index in step with deliveries; Delivered is final
+        if new_status == 'Delivered':
+            record_delivery(order)
+        elif new_status == 'Cancelled':
+            record_cancellations([order.id])
 
         db.session.commit()
+        forget_tracking(order.tracking_number)
 
         flash('Order status updated successfully', 'success')
         return redirect(url_for('admin_orders'))
 
+    @app.route('/admin/orders/bulk-status', methods=['POST'])
+    @login_required
+    def admin_bulk_update_order_status():
+        if current_user.role != 'admin':
+            if request.is_json:
+                return jsonify({'error': 'Unauthorized access'}), 403
+            flash('Unauthorized access', 'danger')
+            return redirect(url_for('index'))
+
+        # Accepts a JSON body or the bulk form on the orders page
+        if request.is_json:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Expected a JSON object'}), 400
+            to_status = data.get('order_status')
+            order_ids = data.get('order_ids')
+            from_status = data.get('from_status')
+            if order_ids is not None and (
+                    not isinstance(order_ids, list) or len(order_ids) > MAX_BULK_ORDER_IDS
+                    or not all(type(order_id) is int for order_id in order_ids)):
+                return jsonify({'error': f'order_ids must be a list of at most {MAX_BULK_ORDER_IDS} integers'}), 400
+            if from_status is not None and from_status not in ORDER_STATUSES:
+                return jsonify({'error': 'from_status must be an order status'}), 400
+        else:
+            to_status = request.form.get('order_status')
+            order_ids = request.form.getlist('order_ids', type=int)[:MAX_BULK_ORDER_IDS] or None
+            from_status = request.form.get('from_status') or None
+
+        if to_status not in ORDER_STATUSES or (order_ids is None and not from_status):
+            if request.is_json:
+                return jsonify({'error': 'Give a valid order_status and order_ids or from_status'}), 400
+            flash('Select orders or a current status to update', 'warning')
+            return redirect(url_for('admin_orders'))
+
+        updated, skipped = bulk_change_status(to_status, order_ids=order_ids, from_status=from_status,
+                                              changed_by=current_user.id, note='Bulk update')
+        if to_status == 'Delivered' and updated:
+            record_deliveries(updated)
+        elif to_status == 'Cancelled' and updated:
+            record_cancellations(updated)
+        db.session.commit()
+        forget_orders(updated)
+
+        if request.is_json:
+            return jsonify({'updated': len(updated), 'skipped': skipped})
+        flash(f'{len(updated)} order(s) moved to {to_status}, {skipped} skipped', 'success')
+        return redirect(url_for('admin_orders'))
+
     # ==================== ADMIN - USERS ====================
 
     @app.route('/admin/users')
@@ -864,8 +1024,54 @@ def init_routes(app):
             flash('Unauthorized access', 'danger')
             return redirect(url_for('index'))
 
-        users = User.query.filter_by(role='user').order_by(User.created_at.desc()).all()
-        return render_template('admin/users.html', users=users)
+        search = request.args.get('search', '').strip()
+        segment = request.args.get('segment')
+        sort = request.args.get('sort', 'newest')
+        page = request.args.get('page', 1, type=int)
+
+        # Per-user order stats in one grouped scan, joined rather than loaded per row
+        orders = all_orders()
+        order_stats = db.session.query(
+            orders.c.user_id,
+            func.count(orders.c.id).label('order_count'),
+            func.sum(orders.c.total_amount).label('total_spent'),
+            func.max(orders.c.created_at).label('last_order_at')
+        ).filter(orders.c.order_status != 'Cancelled').group_by(orders.c.user_id).subquery()
+
+        order_count = func.coalesce(order_stats.c.order_count, 0)
+        total_spent = func.coalesce(order_stats.c.total_spent, 0)
+
+        sort_columns = {
+            'newest': User.created_at.desc(),
+            'orders': order_count.desc(),
+            'spend': total_spent.desc(),
+            'last_order': order_stats.c.last_order_at.desc().nullslast(),
+            'lifetime_value': CustomerSegment.lifetime_value.desc().nullslast(),
+            'monetary': CustomerSegment.monetary.desc().nullslast(),
+            'frequency': CustomerSegment.frequency.desc().nullslast(),
+            'recency': CustomerSegment.recency_days.asc().nullslast(),
+        }
+
+        query = User.query.filter_by(role='user').outerjoin(
+            order_stats, order_stats.c.user_id == User.id
+        ).outerjoin(CustomerSegment).options(contains_eager(User.segment)).add_columns(
+            order_count, total_spent, order_stats.c.last_order_at
+        )
+        if search:
+            query = query.filter(or_(
+                User.username.ilike(f'%{search}%'),
+                User.email.ilike(f'%{search}%'),
+                User.city.ilike(f'%{search}%')
+            ))
+        if segment:
+            query = query.filter(CustomerSegment.segment == segment)
+
+        pagination = query.order_by(sort_columns.get(sort, sort_columns['newest']), User.id.desc()).paginate(
+            page=page, per_page=25, error_out=False)
+        refreshed_at = db.session.query(func.max(CustomerSegment.refreshed_at)).scalar()
+
+        return render_template('admin/users.html', users=pagination.items, pagination=pagination,
+                               segments=SEGMENTS, refreshed_at=refreshed_at)
 
     # ==================== UTILITY ====================
 
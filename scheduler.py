@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Periodic job scheduler for e-Nursery
+
+Maintenance jobs register with @job(name, cron_spec) using five-field cron
+specs (minute hour day-of-month month day-of-week, with *, */n, a-b and
+lists). Every node may run this script: at each scheduled minute the nodes
+race to advance the job's row in job_locks with a guarded UPDATE, and only
+the node whose UPDATE matched runs the job. Each run's duration, result
+and error are recorded in job_runs.
+
+Run one per app node (extra copies are harmless):
+    python scheduler.py
+    python scheduler.py --run-now <job>   # run a job once, ignoring its schedule
+"""
+
+import os
+import socket
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, JobLock, JobRun
+from archive import archive_orders
+from carts import expire_carts
+from forecast import run_forecast
+from outbox import purge_processed
+from product_stats import recalculate_product_stats
+from recommendations import build_recommendations
+from segments import build_segments
+
+KEEP_JOB_RUNS_DAYS = 30
+OWNER = f'{socket.gethostname()}:{os.getpid()}'
+
+_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+def _parse_field(field, lo, hi):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = lo, hi
+        elif '-' in part:
+            start, end = map(int, part.split('-'))
+        else:
+            start = end = int(part)
+        if start < lo or end > hi or start > end:
+            raise ValueError(f'{field!r} is outside {lo}-{hi}')
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSpec:
+    """A parsed cron expression; day-of-week counts from 0 = Sunday, as in cron."""
+
+    def __init__(self, spec):
+        fields = spec.split()
+        if len(fields) != 5:
+            raise ValueError(f'Cron spec needs 5 fields: {spec!r}')
+        self.spec = spec
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            _parse_field(field, lo, hi) for field, (lo, hi) in zip(fields, _FIELD_RANGES)
+        ]
+
+    def matches(self, moment):
+        return (moment.minute in self.minutes and moment.hour in self.hours and moment.day in self.days
+                and moment.month in self.months and (moment.weekday() + 1) % 7 in self.weekdays)
+
+    def __repr__(self):
+        return f'<CronSpec {self.spec}>'
+
+
+_jobs = {}
+
+
+def job(name, spec):
+    """Register ``func()`` to run on the cron ``spec``; its return value is stored with the run."""
+    def register(func):
+        _jobs[name] = (CronSpec(spec), func)
+        return func
+    return register
+
+
+def claim(name, slot):
+    """Claim the run of ``name`` scheduled at ``slot``; True for exactly one node per slot."""
+    claimed = db.session.execute(db.update(JobLock).where(
+        JobLock.name == name,
+        db.or_(JobLock.last_slot.is_(None), JobLock.last_slot < slot)
+    ).values(last_slot=slot, owner=OWNER, claimed_at=datetime.utcnow())).rowcount
+    if not claimed:
+        # First run anywhere: create the row; a node that loses the insert race lost the claim
+        if db.session.get(JobLock, name) is None:
+            db.session.add(JobLock(name=name, last_slot=slot, owner=OWNER, claimed_at=datetime.utcnow()))
+            try:
+                db.session.commit()
+                return True
+            except IntegrityError:
+                db.session.rollback()
+                return False
+    db.session.commit()
+    return bool(claimed)
+
+
+def run_job(name):
+    """Run one job now and record its timing; returns the JobRun."""
+    _, func = _jobs[name]
+    run = JobRun(job_name=name, owner=OWNER, started_at=datetime.utcnow())
+    started = time.perf_counter()
+    try:
+        result = func()
+        run.status = 'ok'
+        run.result = None if result is None else str(result)[:200]
+    except Exception:
+        db.session.rollback()
+        run.status = 'error'
+        run.error = traceback.format_exc(limit=10)
+    run.duration_ms = int((time.perf_counter() - started) * 1000)
+    db.session.add(run)
+    db.session.commit()
+    return run
+
+
+def run_due(slot):
+    """Run every job scheduled for the minute ``slot`` that this node manages to claim."""
+    for name, (spec, _) in _jobs.items():
+        if spec.matches(slot) and claim(name, slot):
+            run = run_job(name)
+            print(f"{slot:%Y-%m-%d %H:%M} {name}: {run.status} in {run.duration_ms}ms")
+
+
+def run_scheduler():
+    slot = datetime.utcnow().replace(second=0, microsecond=0)
+    while True:
+        # Jobs run inline, so after a long one catch up on every minute it overlapped;
+        # claim() makes a slot that another node already ran a no-op
+        now = datetime.utcnow()
+        while slot <= now:
+            run_due(slot)
+            slot += timedelta(minutes=1)
+        db.session.remove()
+        time.sleep(max((slot - datetime.utcnow()).total_seconds(), 0))
+
+
+def job_stats(since):
+    """Per job: runs, failures, average and worst duration (ms), and the last run's start, since ``since``."""
+    rows = db.session.query(
+        JobRun.job_name,
+        db.func.count(JobRun.id),
+        db.func.sum(db.case((JobRun.status == 'error', 1), else_=0)),
+        db.func.avg(JobRun.duration_ms),
+        db.func.max(JobRun.duration_ms),
+        db.func.max(JobRun.started_at)
+    ).filter(JobRun.started_at >= since).group_by(JobRun.job_name).order_by(JobRun.job_name).all()
+    return [{
+        'name': name,
+        'runs': runs,
+        'failures': failures,
+        'avg_ms': avg_ms,
+        'max_ms': max_ms,
+        'last_run': last_run,
+        'spec': _jobs[name][0].spec if name in _jobs else None,
+    } for name, runs, failures, avg_ms, max_ms, last_run in rows]
+
+
+# ==================== MAINTENANCE JOBS ====================
+
+@job('archive_orders', '30 1 * * *')
+def archive_orders_job():
+    return archive_orders()
+
+
+@job('refresh_product_stats', '0 2 * * *')
+def refresh_product_stats_job():
+    recalculate_product_stats()
+    db.session.commit()
+
+
+@job('build_recommendations', '15 2 * * *')
+def build_recommendations_job():
+    return build_recommendations()
+
+
+@job('run_forecast', '30 2 * * *')
+def run_forecast_job():
+    return run_forecast()
+
+
+@job('build_segments', '45 2 * * *')
+def build_segments_job():
+    return build_segments()
+
+
+@job('purge_outbox', '0 3 * * *')
+def purge_outbox_job():
+    return purge_processed()
+
+
+@job('expire_carts', '5 3 * * *')
+def expire_carts_job():
+    return expire_carts()
+
+
+@job('purge_job_runs', '10 3 * * *')
+def purge_job_runs_job():
+    cutoff = datetime.utcnow() - timedelta(days=KEEP_JOB_RUNS_DAYS)
+    count = JobRun.query.filter(JobRun.started_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+@job('analyze_database', '30 3 * * *')
+def analyze_database_job():
+    # ANALYZE and VACUUM can't run inside a transaction
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+
+@job('vacuum_database', '0 4 * * 0')
+def vacuum_database_job():
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('VACUUM')
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        if '--run-now' in sys.argv:
+            name = sys.argv[sys.argv.index('--run-now') + 1]
+            run = run_job(name)
+            print(f"{'✅' if run.status == 'ok' else '❌'} {name}: {run.status} in {run.duration_ms}ms")
+            if run.error:
+                print(run.error)
+        else:
+            print(f"⏰ Scheduler started as {OWNER} with {len(_jobs)} job(s)")
+            run_scheduler()
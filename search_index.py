@@ -0,0 +1,247 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from sqlalchemy import or_
+
+from models import db, Plant, Ingredient
+from catalog_index import get_catalog_version, COUNTER_REFRESH_INTERVAL
+
+SUGGEST_LIMIT = 8
+MAX_PREFIX_SCAN = 200
+# Suggest is hit on every keystroke, so the catalog version is re-read at most this often
+VERSION_CHECK_INTERVAL = 5
+
+# Fuzzy matching kicks in when plain substring search finds fewer results than this
+FUZZY_MIN_RESULTS = 3
+FUZZY_THRESHOLD = 0.3
+FUZZY_LIMIT = 20
+MAX_TERMS_PER_PRODUCT = 16
+MAX_TERM_LENGTH = 64
+# updated_at is stamped when a row is written, not when it commits, so each sync
+# re-reads this far behind the newest timestamp it has seen
+SYNC_OVERLAP = timedelta(minutes=5)
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    return ' '.join(_WORD_RE.findall((text or '').lower()))
+
+
+class PrefixIndex:
+    """Sorted array of search keys for prefix lookups with bisect.
+
+    Every product is indexed under its full name and under each word of its
+    name, so "basil" finds "Tulsi (Holy Basil)". Categories and ingredient
+    types are indexed too.
+    """
+
+    def __init__(self, suggestions):
+        # suggestions: iterable of (kind, key, label, popularity)
+        self.suggestions = []
+        keyed = []
+        for kind, key, label, popularity in suggestions:
+            slot = len(self.suggestions)
+            self.suggestions.append((kind, key, label, popularity))
+            name = normalize(label)
+            terms = {name} | set(name.split())
+            keyed.extend((term, slot) for term in terms if term)
+        keyed.sort()
+        self.keys = [term for term, _ in keyed]
+        self.slots = [slot for _, slot in keyed]
+
+    def lookup(self, prefix, limit=SUGGEST_LIMIT):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        seen = set()
+        start = bisect_left(self.keys, prefix)
+        for i in range(start, min(start + MAX_PREFIX_SCAN, len(self.keys))):
+            if not self.keys[i].startswith(prefix):
+                break
+            seen.add(self.slots[i])
+
+        matches = sorted((self.suggestions[slot] for slot in seen), key=lambda s: (-s[3], s[2]))
+        return matches[:limit]
+
+
+def _build_suggestions():
+    for plant in db.session.query(Plant.id, Plant.name, Plant.category, Plant.units_sold, Plant.wishlist_count):
+        yield 'plant', plant.id, plant.name, (plant.units_sold or 0) + (plant.wishlist_count or 0)
+
+    for ingredient in db.session.query(Ingredient.id, Ingredient.name, Ingredient.units_sold):
+        yield 'ingredient', ingredient.id, ingredient.name, ingredient.units_sold or 0
+
+    for category, count in db.session.query(Plant.category, db.func.count(Plant.id)).group_by(Plant.category):
+        yield 'category', category, category, count
+
+    for type_, count in db.session.query(Ingredient.type, db.func.count(Ingredient.id)).group_by(Ingredient.type):
+        yield 'type', type_, type_, count
+
+
+_state = {'index': None, 'version': None, 'checked_at': 0, 'built_at': 0}
+_lock = threading.Lock()
+
+
+def get_prefix_index():
+    """Return this worker's prefix index, rebuilding it when the catalog version moves
+    or its popularity counts are older than COUNTER_REFRESH_INTERVAL."""
+    now = time.monotonic()
+    if _state['index'] is not None and now - _state['checked_at'] < VERSION_CHECK_INTERVAL:
+        return _state['index']
+
+    version = get_catalog_version()
+    with _lock:
+        if (_state['index'] is None or _state['version'] != version
+                or now - _state['built_at'] >= COUNTER_REFRESH_INTERVAL):
+            _state['index'] = PrefixIndex(list(_build_suggestions()))
+            _state['version'] = version
+            _state['built_at'] = now
+        _state['checked_at'] = now
+    return _state['index']
+
+
+def trigrams(term):
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def search_terms(name, synonyms):
+    """Terms a product is matched on: its name and synonyms, whole, without spaces, and word by word."""
+    terms = set()
+    for text in [name] + (synonyms or '').split(','):
+        text = normalize(text)[:MAX_TERM_LENGTH]
+        if not text:
+            continue
+        terms.add(text)
+        terms.add(text.replace(' ', ''))
+        terms.update(word for word in text.split() if len(word) >= 3)
+    return sorted(terms)[:MAX_TERMS_PER_PRODUCT]
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to product search terms.
+
+    Similarity is the Jaccard index of trigram sets, taken as the best score
+    over a product's terms. Products can be added and removed one at a time,
+    so admin edits only re-index the rows that changed.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(set)  # trigram -> term ids
+        self.terms = {}  # term id -> (product id, term, trigram count)
+        self.product_terms = {}  # product id -> term ids
+        self.synced_through = None  # newest updated_at indexed so far
+        self._next_term_id = 0
+
+    def add(self, product_id, name, synonyms=None):
+        self.remove(product_id)
+        term_ids = []
+        for term in search_terms(name, synonyms):
+            term_id = self._next_term_id
+            self._next_term_id += 1
+            grams = trigrams(term)
+            for gram in grams:
+                self.postings[gram].add(term_id)
+            self.terms[term_id] = (product_id, term, len(grams))
+            term_ids.append(term_id)
+        self.product_terms[product_id] = term_ids
+
+    def remove(self, product_id):
+        for term_id in self.product_terms.pop(product_id, ()):
+            _, term, _ = self.terms.pop(term_id)
+            for gram in trigrams(term):
+                postings = self.postings.get(gram)
+                if postings is not None:
+                    postings.discard(term_id)
+                    if not postings:
+                        del self.postings[gram]
+
+    def search(self, query, limit=FUZZY_LIMIT, threshold=FUZZY_THRESHOLD):
+        """Return product ids ranked by similarity to ``query``."""
+        query = normalize(query)
+        if not query:
+            return []
+
+        scores = {}
+        for variant in {query, query.replace(' ', '')}:
+            grams = trigrams(variant)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.postings.get(gram, ()))
+            for term_id, common in shared.items():
+                product_id, _, term_grams = self.terms[term_id]
+                similarity = common / (len(grams) + term_grams - common)
+                if similarity > scores.get(product_id, 0):
+                    scores[product_id] = similarity
+
+        ranked = sorted((score, product_id) for product_id, score in scores.items() if score >= threshold)
+        return [product_id for _, product_id in reversed(ranked)][:limit]
+
+    def sync(self, model):
+        """Index rows changed since the last sync (less SYNC_OVERLAP) and drop deleted ones."""
+        query = db.session.query(model.id, model.name, model.synonyms, model.updated_at)
+        if self.synced_through is not None:
+            query = query.filter(model.updated_at >= self.synced_through - SYNC_OVERLAP)
+
+        for product_id, name, synonyms, updated_at in query:
+            self.add(product_id, name, synonyms)
+            if updated_at and (self.synced_through is None or updated_at > self.synced_through):
+                self.synced_through = updated_at
+
+        live_ids = {product_id for (product_id,) in db.session.query(model.id)}
+        for product_id in set(self.product_terms) - live_ids:
+            self.remove(product_id)
+
+
+_SEARCH_MODELS = {
+    'plant': Plant,
+    'ingredient': Ingredient,
+}
+
+_trigram_indexes = {}
+_trigram_lock = threading.Lock()
+
+
+def get_trigram_index(kind):
+    """Return this worker's trigram index for 'plant' or 'ingredient', synced to the catalog version."""
+    version = get_catalog_version()
+    cached = _trigram_indexes.get(kind)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with _trigram_lock:
+        cached = _trigram_indexes.get(kind)
+        if cached is None or cached[0] != version:
+            index = cached[1] if cached is not None else TrigramIndex()
+            index.sync(_SEARCH_MODELS[kind])
+            cached = (version, index)
+            _trigram_indexes[kind] = cached
+    return cached[1]
+
+
+def search_product_ids(kind, search):
+    """Ids of products matching ``search``, best matches first.
+
+    Substring matches on name, synonyms or description come first. When there are too
+    few of them, typo-tolerant trigram matches are appended. Returns
+    ``(ids, fuzzy)`` where ``fuzzy`` tells whether any trigram matches were
+    added.
+    """
+    model = _SEARCH_MODELS[kind]
+    ids = [product_id for (product_id,) in db.session.query(model.id).filter(or_(
+        model.name.ilike(f'%{search}%'),
+        model.synonyms.ilike(f'%{search}%'),
+        model.description.ilike(f'%{search}%')
+    ))]
+    if len(ids) >= FUZZY_MIN_RESULTS:
+        return ids, False
+
+    exact = set(ids)
+    fuzzy = [product_id for product_id in get_trigram_index(kind).search(search) if product_id not in exact]
+    return ids + fuzzy, bool(fuzzy)
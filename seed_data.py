@@ -1,5 +1,11 @@
 from app import app, db
-from models import User, Plant, Ingredient, Order, OrderItem
+from models import User, Plant, Ingredient, Order, OrderItem, OrderStatusEvent
+from product_stats import recalculate_product_stats
+from recommendations import build_recommendations
+from forecast import run_forecast
+from segments import build_segments
+from purchases import rebuild_verified_purchases
+from order_status import STATUS_FLOW
 from datetime import datetime, timedelta
 import random
 
@@ -54,6 +60,7 @@ def seed_database():
         medicinal_plants = [
             {
                 'name': 'Tulsi (Holy Basil)',
+                'synonyms': 'tulasi, ocimum sanctum',
                 'category': 'Medicinal',
                 'price': 150.00,
                 'description': 'Sacred plant known for its medicinal properties. Excellent for respiratory health, immunity booster, and stress relief.',
@@ -65,6 +72,7 @@ def seed_database():
             },
             {
                 'name': 'Aloe Vera',
+                'synonyms': 'ghritkumari, aloevera',
                 'category': 'Medicinal',
                 'price': 120.00,
                 'description': 'Succulent plant with gel-filled leaves. Great for skin care, burns, digestion, and air purification.',
@@ -76,6 +84,7 @@ def seed_database():
             },
             {
                 'name': 'Neem Tree',
+                'synonyms': 'margosa, azadirachta indica',
                 'category': 'Medicinal',
                 'price': 250.00,
                 'description': 'Powerful medicinal tree. Known for antibacterial, antifungal properties. Every part is useful - leaves, bark, seeds.',
@@ -194,6 +203,7 @@ def seed_database():
             },
             {
                 'name': 'Brinjal Plant (Baingan)',
+                'synonyms': 'eggplant, aubergine',
                 'category': 'Vegetable',
                 'price': 85.00,
                 'description': 'Purple eggplant variety. Perfect for curries and bharta. Produces 15-20 fruits per plant.',
@@ -216,6 +226,7 @@ def seed_database():
             },
             {
                 'name': 'Lady Finger (Bhindi)',
+                'synonyms': 'okra',
                 'category': 'Vegetable',
                 'price': 75.00,
                 'description': 'Okra plant perfect for Indian cooking. High yielding and easy to grow in summer.',
@@ -511,6 +522,21 @@ def seed_database():
             db.session.add(order)
             db.session.flush()
 
+            # Status history: walk the normal path up to the seeded status, a few hours per step
+            path = ['Pending', 'Cancelled'] if order.order_status == 'Cancelled' else \
+                STATUS_FLOW[:STATUS_FLOW.index(order.order_status) + 1]
+            changed_at = order.created_at
+            for step, status in enumerate(path):
+                if step:
+                    changed_at += timedelta(hours=random.randint(4, 30))
+                db.session.add(OrderStatusEvent(
+                    order_id=order.id,
+                    from_status=path[step - 1] if step else None,
+                    to_status=status,
+                    changed_by=user.id if step == 0 or status == 'Cancelled' else admin.id,
+                    created_at=changed_at
+                ))
+
             order_total = 0
 
             for _ in range(num_items):
@@ -543,6 +569,23 @@ def seed_database():
         db.session.commit()
         print("✓ Orders created")
 
+        rebuild_verified_purchases()
+        db.session.commit()
+        print("✓ Verified purchases indexed")
+
+        recalculate_product_stats()
+        db.session.commit()
+        print("✓ Product stats calculated")
+
+        build_recommendations()
+        print("✓ Recommendations built")
+
+        run_forecast()
+        print("✓ Demand forecast calculated")
+
+        build_segments()
+        print("✓ Customer segments built")
+
         print("✅ Database seeded successfully!")
         print("\n" + "=" * 50)
         print("LOGIN CREDENTIALS:")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Customer RFM segmentation for e-Nursery
+
+Computes recency, frequency and monetary scores plus lifetime value for
+every customer from one grouped scan of live and archived orders, and rewrites
+the customer_segments table that the admin users page sorts and filters on.
+
+Run nightly:
+    python segments.py
+"""
+
+from datetime import datetime, timedelta
+
+from models import db, User, CustomerSegment
+from archive import all_orders
+
+RFM_WINDOW_DAYS = 365
+
+# First matching rule wins; scores are 1 (worst) to 5 (best)
+SEGMENT_RULES = [
+    ('Champions', lambda r, f, m: r >= 4 and f >= 4 and m >= 4),
+    ('Loyal', lambda r, f, m: r >= 3 and f >= 4),
+    ('Big Spenders', lambda r, f, m: m >= 5),
+    ('New', lambda r, f, m: r >= 4 and f <= 2),
+    ('Promising', lambda r, f, m: r >= 3),
+    ('At Risk', lambda r, f, m: r <= 2 and f >= 3),
+    ('Hibernating', lambda r, f, m: True),
+]
+NO_ORDERS_SEGMENT = 'No Orders'
+SEGMENTS = [name for name, _ in SEGMENT_RULES] + [NO_ORDERS_SEGMENT]
+
+
+def quintile_scores(values, higher_is_better=True):
+    """Score each value 1-5 by its rank among all values; equal values share the midpoint of their ranks"""
+    ordered = sorted(values, reverse=not higher_is_better)
+    first_rank, last_rank = {}, {}
+    for rank, value in enumerate(ordered):
+        first_rank.setdefault(value, rank)
+        last_rank[value] = rank
+    return [(first_rank[value] + last_rank[value]) * 5 // (2 * len(values)) + 1 for value in values]
+
+
+def classify(r, f, m):
+    for name, rule in SEGMENT_RULES:
+        if rule(r, f, m):
+            return name
+
+
+def build_segments(now=None):
+    """Recompute every customer's segment in one transaction"""
+    now = now or datetime.utcnow()
+    window_start = now - timedelta(days=RFM_WINDOW_DAYS)
+    orders = all_orders()
+    in_window = orders.c.created_at >= window_start
+
+    stats = db.session.query(
+        orders.c.user_id,
+        db.func.max(orders.c.created_at),
+        db.func.sum(db.case((in_window, 1), else_=0)),
+        db.func.sum(db.case((in_window, orders.c.total_amount), else_=0)),
+        db.func.sum(orders.c.total_amount)
+    ).filter(orders.c.order_status != 'Cancelled').group_by(orders.c.user_id).all()
+
+    customer_ids = [user_id for (user_id,) in db.session.query(User.id).filter_by(role='user')]
+    customers = set(customer_ids)
+    stats = [row for row in stats if row[0] in customers]
+
+    recency = [(now - last_order_at).days for _, last_order_at, _, _, _ in stats]
+    r_scores = quintile_scores(recency, higher_is_better=False)
+    f_scores = quintile_scores([frequency for _, _, frequency, _, _ in stats])
+    m_scores = quintile_scores([monetary for _, _, _, monetary, _ in stats])
+
+    rows = []
+    for i, (user_id, last_order_at, frequency, monetary, lifetime_value) in enumerate(stats):
+        rows.append({
+            'user_id': user_id,
+            'last_order_at': last_order_at,
+            'recency_days': recency[i],
+            'frequency': frequency,
+            'monetary': monetary,
+            'lifetime_value': lifetime_value,
+            'r_score': r_scores[i],
+            'f_score': f_scores[i],
+            'm_score': m_scores[i],
+            'segment': classify(r_scores[i], f_scores[i], m_scores[i]),
+            'refreshed_at': now,
+        })
+
+    with_orders = {row['user_id'] for row in rows}
+    for user_id in customer_ids:
+        if user_id not in with_orders:
+            rows.append({
+                'user_id': user_id,
+                'last_order_at': None,
+                'recency_days': None,
+                'frequency': 0,
+                'monetary': 0,
+                'lifetime_value': 0,
+                'r_score': None,
+                'f_score': None,
+                'm_score': None,
+                'segment': NO_ORDERS_SEGMENT,
+                'refreshed_at': now,
+            })
+
+    db.session.query(CustomerSegment).delete()
+    if rows:
+        db.session.execute(db.insert(CustomerSegment), rows)
+    db.session.commit()
+    return len(rows)
+
+
+if __name__ == '__main__':
+    from app import app
+
+    with app.app_context():
+        count = build_segments()
+    print(f"✅ {count} customer segment(s) refreshed")
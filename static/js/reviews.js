@@ -0,0 +1,64 @@
+// "Load More Reviews" button: appends the next keyset page from the reviews JSON endpoint
+(function () {
+    var button = document.getElementById('load-more-reviews');
+    if (!button) {
+        return;
+    }
+    var list = document.getElementById('reviews');
+
+    function reviewCard(review) {
+        var card = document.createElement('div');
+        card.className = 'card mb-3';
+        var body = document.createElement('div');
+        body.className = 'card-body';
+
+        var header = document.createElement('div');
+        header.className = 'd-flex justify-content-between';
+        var author = document.createElement('h6');
+        author.textContent = review.author;
+        if (review.verified) {
+            var badge = document.createElement('span');
+            badge.className = 'badge bg-success ms-1';
+            badge.textContent = 'Verified Buyer';
+            author.appendChild(badge);
+        }
+        var stars = document.createElement('span');
+        stars.className = 'text-warning';
+        stars.textContent = '★'.repeat(review.rating);
+        header.appendChild(author);
+        header.appendChild(stars);
+
+        var comment = document.createElement('p');
+        comment.className = 'mb-1';
+        comment.textContent = review.comment;
+        var date = document.createElement('small');
+        date.className = 'text-muted';
+        date.textContent = review.created_at;
+
+        body.appendChild(header);
+        body.appendChild(comment);
+        body.appendChild(date);
+        card.appendChild(body);
+        return card;
+    }
+
+    button.addEventListener('click', function () {
+        button.disabled = true;
+        fetch(button.dataset.url + '&after=' + encodeURIComponent(button.dataset.cursor))
+            .then(function (response) { return response.json(); })
+            .then(function (page) {
+                page.reviews.forEach(function (review) {
+                    list.appendChild(reviewCard(review));
+                });
+                if (page.next_cursor) {
+                    button.dataset.cursor = page.next_cursor;
+                    button.disabled = false;
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(function () {
+                button.disabled = false;
+            });
+    });
+})();
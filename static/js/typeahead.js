@@ -0,0 +1,55 @@
+// Search-as-you-type suggestions for inputs with a data-suggest-url attribute
+document.querySelectorAll('input[data-suggest-url]').forEach(function (input) {
+    var menu = document.createElement('div');
+    menu.className = 'list-group position-absolute w-100 shadow-sm';
+    menu.style.zIndex = 1050;
+    input.parentNode.classList.add('position-relative');
+    input.parentNode.appendChild(menu);
+    input.setAttribute('autocomplete', 'off');
+
+    var timer = null;
+    var latest = 0;
+
+    function clear() {
+        menu.innerHTML = '';
+    }
+
+    function render(suggestions) {
+        clear();
+        suggestions.forEach(function (suggestion) {
+            var link = document.createElement('a');
+            link.className = 'list-group-item list-group-item-action d-flex justify-content-between';
+            link.href = suggestion.url;
+            link.textContent = suggestion.label;
+            var kind = document.createElement('small');
+            kind.className = 'text-muted';
+            kind.textContent = suggestion.kind;
+            link.appendChild(kind);
+            menu.appendChild(link);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        clearTimeout(timer);
+        var query = input.value.trim();
+        if (!query) {
+            clear();
+            return;
+        }
+        timer = setTimeout(function () {
+            var request = ++latest;
+            fetch(input.dataset.suggestUrl + '?q=' + encodeURIComponent(query))
+                .then(function (response) { return response.json(); })
+                .then(function (suggestions) {
+                    if (request === latest) {
+                        render(suggestions);
+                    }
+                });
+        }, 150);
+    });
+
+    input.addEventListener('blur', function () {
+        // Let a click on a suggestion land before the menu goes away
+        setTimeout(clear, 200);
+    });
+});
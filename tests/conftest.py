@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import event
+
+# Point the app at an in-memory database before app.py creates its tables
+os.environ['DATABASE_URL'] = 'sqlite://'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+from models import db, User  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+        admin = User(username='admin', email='admin@enursery.com', role='admin')
+        admin.set_password('admin123')
+        customer = User(username='customer', email='customer@example.com', role='customer')
+        customer.set_password('password123')
+        db.session.add_all([admin, customer])
+        db.session.commit()
+    # Requests push their own app context, so each gets a fresh session as in production
+    yield flask_app
+
+
+def login(app, username, password):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    client.get('/about')  # consume the welcome flash
+    return client
+
+
+class QueryCounter:
+    """Counts SQL statements sent through the engine while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def count_queries(app, client, url):
+    with app.app_context():
+        engine = db.engine
+    with QueryCounter(engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
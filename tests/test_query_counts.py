@@ -0,0 +1,58 @@
+import pytest
+
+from models import db, User, Plant, Order, OrderItem, Wishlist
+from conftest import login, count_queries
+
+
+def add_plants(count):
+    plants = [Plant(name=f'Plant {i}', category='Flower', price=100 + i, stock=10) for i in range(count)]
+    db.session.add_all(plants)
+    db.session.flush()
+    return plants
+
+
+def add_orders(count, user=None):
+    """``count`` orders of two lines each; each order gets its own buyer unless ``user`` is given."""
+    plants = add_plants(2)
+    first = User.query.count()
+    for i in range(first, first + count):
+        buyer = user
+        if buyer is None:
+            buyer = User(username=f'buyer{i}', email=f'buyer{i}@example.com')
+            buyer.set_password('password123')
+            db.session.add(buyer)
+            db.session.flush()
+        order = Order(user_id=buyer.id, total_amount=300, payment_method='COD')
+        order.generate_tracking_number()
+        db.session.add(order)
+        db.session.flush()
+        for plant in plants:
+            db.session.add(OrderItem(order_id=order.id, item_type='plant', item_id=plant.id, item_name=plant.name,
+                                     quantity=1, price=plant.price, subtotal=plant.price))
+    db.session.commit()
+
+
+def add_wishlist(user, count):
+    for plant in add_plants(count):
+        db.session.add(Wishlist(user_id=user.id, plant_id=plant.id))
+    db.session.commit()
+
+
+def customer():
+    return User.query.filter_by(username='customer').one()
+
+
+@pytest.mark.parametrize('setup, username, password, url', [
+    (lambda n: add_orders(n, customer()), 'customer', 'password123', '/orders'),
+    (lambda n: add_orders(n), 'admin', 'admin123', '/admin/orders'),
+    (lambda n: add_wishlist(customer(), n), 'customer', 'password123', '/wishlist'),
+])
+def test_list_pages_run_a_fixed_number_of_queries(app, setup, username, password, url):
+    with app.app_context():
+        setup(1)
+    client = login(app, username, password)
+    with_one = count_queries(app, client, url)
+
+    with app.app_context():
+        setup(10)
+    assert count_queries(app, client, url) == with_one
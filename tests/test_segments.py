@@ -0,0 +1,19 @@
+from segments import quintile_scores
+
+
+def test_distinct_values_spread_over_all_quintiles():
+    assert quintile_scores([10, 50, 30, 20, 40]) == [1, 5, 3, 2, 4]
+    assert quintile_scores([10, 50, 30, 20, 40], higher_is_better=False) == [5, 1, 3, 4, 2]
+
+
+def test_equal_values_get_equal_scores():
+    assert quintile_scores([1, 1, 1, 1, 1]) == [3, 3, 3, 3, 3]
+
+    scores = quintile_scores([1, 1, 1, 2, 2, 9, 9, 9, 9, 9])
+    assert len(set(scores[:3])) == len(set(scores[3:5])) == len(set(scores[5:])) == 1
+    assert scores[0] < scores[3] < scores[5]
+
+
+def test_ties_follow_the_direction():
+    scores = quintile_scores([3, 3, 100, 100, 7], higher_is_better=False)
+    assert scores[0] == scores[1] > scores[4] > scores[2] == scores[3]
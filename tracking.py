@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+from archive import find_order_by_tracking_number
+from order_status import order_timeline
+
+# Per-worker caches, so status changes made in another worker show up within the TTL
+SNAPSHOT_TTL = 60
+NEGATIVE_TTL = 300  # unknown numbers are what guessing bots send, so remember them longer
+CACHE_SIZE = 10000
+
+# Tracking lookups allowed per client IP: a burst of RATE_LIMIT_BURST, refilled at RATE_LIMIT_PER_MINUTE
+RATE_LIMIT_BURST = 10
+RATE_LIMIT_PER_MINUTE = 10
+MAX_TRACKED_CLIENTS = 10000
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after a per-entry TTL."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (_, value) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets; the least recently seen keys are dropped past max_keys."""
+
+    def __init__(self, burst, per_minute, max_keys):
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last refill)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+_MISSING = object()
+_snapshots = TTLCache(CACHE_SIZE)
+limiter = TokenBucketLimiter(RATE_LIMIT_BURST, RATE_LIMIT_PER_MINUTE, MAX_TRACKED_CLIENTS)
+
+
+def _snapshot(order):
+    return {
+        'id': order.id,
+        'user_id': order.user_id,
+        'tracking_number': order.tracking_number,
+        'order_status': order.order_status,
+        'created_at': order.created_at,
+        'estimated_delivery': order.estimated_delivery,
+        'events': [{
+            'to_status': event.to_status,
+            'note': event.note,
+            'created_at': event.created_at,
+        } for event in order_timeline(order.id)],
+    }
+
+
+def lookup_tracking(tracking_number):
+    """Status snapshot for a tracking number, or None if there is no such order."""
+    tracking_number = (tracking_number or '').strip().upper()
+    if not tracking_number:
+        return None
+
+    snapshot = _snapshots.get(tracking_number, _MISSING)
+    if snapshot is not _MISSING:
+        return snapshot
+
+    order = find_order_by_tracking_number(tracking_number)
+    if order is None:
+        _snapshots.set(tracking_number, None, NEGATIVE_TTL)
+        return None
+
+    snapshot = _snapshot(order)
+    _snapshots.set(tracking_number, snapshot, SNAPSHOT_TTL)
+    return snapshot
+
+
+def forget_tracking(tracking_number):
+    """Drop a cached snapshot (or negative entry) after the order changes or is created."""
+    _snapshots.delete((tracking_number or '').upper())
+
+
+def forget_orders(order_ids):
+    order_ids = set(order_ids)
+    _snapshots.delete_where(lambda snapshot: snapshot is not None and snapshot['id'] in order_ids)
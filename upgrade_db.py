@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Schema upgrade for existing e-Nursery databases
+
+db.create_all() only creates missing tables; it never changes tables that
+already exist. upgrade_schema() creates missing tables, then adds the
+columns and indexes that models.py has gained since a database was made,
+and rebuilds SQLite tables that now need AUTOINCREMENT. Denormalized
+counters on tables that just gained them are recalculated, and a new
+verified purchase index is filled from past deliveries. Every step
+checks the live schema first, so running it again is a no-op.
+
+app.py runs it at startup and prints each change. Before starting several
+workers against an old database, run it once by hand:
+    python upgrade_db.py
+"""
+
+from sqlalchemy import inspect
+
+from models import db, Plant, Ingredient, VerifiedPurchase
+from product_stats import recalculate_product_stats
+from purchases import rebuild_verified_purchases
+
+
+def _column_ddl(column, dialect):
+    ddl = f'{column.name} {column.type.compile(dialect=dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        # Existing rows take the default; NOT NULL is only possible with one
+        ddl += f' DEFAULT {int(default) if isinstance(default, bool) else repr(default)}'
+        if not column.nullable:
+            ddl += ' NOT NULL'
+    return ddl
+
+
+def _add_missing_columns(conn, table, existing):
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {_column_ddl(column, conn.dialect)}')
+        if column.default is not None and column.default.is_callable and 'created_at' in existing:
+            # Timestamps like updated_at start from the row's creation time
+            conn.exec_driver_sql(f'UPDATE {table.name} SET {column.name} = created_at')
+        added.append(column.name)
+    return added
+
+
+def _needs_autoincrement(conn, table):
+    if conn.dialect.name != 'sqlite' or not table.dialect_options['sqlite']['autoincrement']:
+        return False
+    sql = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                               (table.name,)).scalar()
+    return 'AUTOINCREMENT' not in sql.upper()
+
+
+def _rebuild_sqlite_table(conn, table):
+    """Recreate ``table`` from models.py and copy its rows over (SQLite can't alter a primary key)."""
+    old_name = f'_{table.name}_old'
+    columns = ', '.join(column.name for column in table.columns)
+    # Keep foreign keys in other tables pointing at the table name, not the renamed copy
+    conn.exec_driver_sql('PRAGMA legacy_alter_table = ON')
+    for (index_name,) in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (table.name,)).all():
+        conn.exec_driver_sql(f'DROP INDEX {index_name}')
+    conn.exec_driver_sql(f'ALTER TABLE {table.name} RENAME TO {old_name}')
+    table.create(conn)
+    conn.exec_driver_sql(f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}')
+    conn.exec_driver_sql(f'DROP TABLE {old_name}')
+    conn.exec_driver_sql('PRAGMA legacy_alter_table = OFF')
+
+
+def upgrade_schema():
+    """Bring the database up to models.py; returns a list of the changes made."""
+    existing_tables = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    changes = [f'created {table}' for table in sorted(set(db.metadata.tables) - existing_tables)]
+
+    added_columns = {}
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            added = _add_missing_columns(conn, table, existing)
+            if added:
+                added_columns[table.name] = added
+                changes.append(f"added {table.name}.{', '.join(added)}")
+
+            if _needs_autoincrement(conn, table):
+                _rebuild_sqlite_table(conn, table)
+                changes.append(f'rebuilt {table.name} with AUTOINCREMENT')
+            else:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
+    if {Plant.__tablename__, Ingredient.__tablename__} & set(added_columns):
+        recalculate_product_stats()
+        db.session.commit()
+        changes.append('recalculated product stats')
+
+    if VerifiedPurchase.__tablename__ not in existing_tables:
+        # Without this, customers with earlier deliveries could no longer review them
+        rebuild_verified_purchases()
+        db.session.commit()
+        changes.append('indexed verified purchases')
+
+    return changes
+
+
+if __name__ == '__main__':
+    # Importing the app runs upgrade_schema() and prints what it changed
+    from app import app
+
+    with app.app_context():
+        upgrade_schema()
+    print("✅ Database schema is up to date")